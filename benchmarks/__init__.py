@@ -0,0 +1,5 @@
+"""Benchmarks of diaspy hot paths.
+
+They run offline, on synthetic payloads shaped like the ones sent by pods,
+either directly or served by a stand-in pod (see benchmarks.fakepod).
+"""
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+"""Runs benchmarks and compares results with stored baseline.
+
+Usage: python -m benchmarks [--baseline FILE] [--save FILE] [--threshold RATIO] [--large] [benchmark ...]
+
+Exits with status 1 when any result is worse (higher) than the baseline
+by more than the threshold.
+
+Timings depend on the machine, so the baseline should be generated on
+the machine it is compared on (`make bench-baseline`, then `make bench`).
+To make baselines from other machines usable, every run also times a
+fixed calibration workload, and CPU-bound timings are compared relative
+to it. Timings dominated by the simulated latency of the pod, and sizes
+of objects, are compared as they are.
+"""
+
+
+import argparse
+import importlib
+import inspect
+import json
+import platform
+import sys
+import timeit
+
+
+MODULES = ('memory', 'profile', 'streams', 'parsing', 'contacts', 'connection', 'imports')
+
+
+def calibrate():
+	"""Returns seconds needed by fixed pure-Python workload
+	(JSON round trips and sorting, like the benchmarked code).
+	"""
+	data = [{'id': i, 'guid': '{0:x}'.format(i), 'text': 'Post number {0}.'.format(i) * 4} for i in range(2000)]
+
+	def workload():
+		decoded = json.loads(json.dumps(data))
+		sorted(decoded, key=lambda post: post['guid'])
+
+	return min(timeit.repeat(workload, number=5, repeat=9))
+
+
+def run(names, large=False):
+	"""Returns dict mapping benchmark names to (value, unit, calibrated)
+	tuples (`calibrated` tells whether value is compared relative to
+	calibration) and seconds of calibration workload.
+	"""
+	results = {}
+	# machine is not equally busy during the whole run, calibration
+	# is repeated between benchmarks and the best result is used
+	calibration = calibrate()
+	for name in names:
+		module = importlib.import_module('benchmarks.{0}'.format(name))
+		unit = getattr(module, 'unit', 's')
+		calibrated = (unit == 's' and getattr(module, 'calibrated', True))
+		kwargs = ({'large': True} if large and 'large' in inspect.signature(module.run).parameters else {})
+		print('running {0}...'.format(name), file=sys.stderr)
+		for key, value in module.run(**kwargs).items():
+			results[key] = (value, unit, calibrated)
+		calibration = min(calibration, calibrate())
+	return (results, calibration)
+
+
+def humanize(value, unit):
+	"""Returns value formatted for printing.
+	"""
+	if unit != 's': return '{0:.1f} {1}'.format(value, unit)
+	for scale, prefix in ((1, 's'), (1e-3, 'ms'), (1e-6, 'us')):
+		if value >= scale: return '{0:.3f} {1}'.format(value / scale, prefix)
+	return '{0:.1f} ns'.format(value * 1e9)
+
+
+def compare(results, baseline, threshold, scale=1):
+	"""Prints results next to baseline and returns names of regressed benchmarks.
+
+	:param scale: how many times this machine is slower than the one baseline was made on
+	:type scale: float
+	"""
+	regressions = []
+	print('{0:<36} {1:>14} {2:>14} {3:>9}'.format('benchmark', 'baseline', 'result', 'change'))
+	for name, (value, unit, calibrated) in sorted(results.items()):
+		before = baseline.get(name)
+		if before is None:
+			print('{0:<36} {1:>14} {2:>14} {3:>9}'.format(name, '-', humanize(value, unit), ''))
+			continue
+		if calibrated: before *= scale
+		change = (value - before) / before if before else 0
+		flag = ''
+		if change > threshold:
+			regressions.append(name)
+			flag = '  REGRESSION'
+		print('{0:<36} {1:>14} {2:>14} {3:>+8.1f}%{4}'.format(name, humanize(before, unit), humanize(value, unit), 100 * change, flag))
+	return regressions
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Runs diaspy benchmarks.')
+	parser.add_argument('names', nargs='*', metavar='benchmark',
+						help='benchmarks to run (default: all of {0})'.format(', '.join(MODULES)))
+	parser.add_argument('--baseline', help='JSON file with results to compare with')
+	parser.add_argument('--save', help='JSON file to store results in (e.g. new baseline)')
+	parser.add_argument('--threshold', type=float, default=0.25,
+						help='relative slowdown reported as regression (default: 0.25)')
+	parser.add_argument('--large', action='store_true',
+						help='also run slow benchmarks on large data (e.g. stream of 100000 posts)')
+	args = parser.parse_args(argv)
+	for name in args.names:
+		if name not in MODULES: parser.error('unknown benchmark: {0}'.format(name))
+
+	results, calibration = run(args.names or MODULES, args.large)
+	baseline, scale = {}, 1
+	if args.baseline:
+		with open(args.baseline) as ifstream:
+			stored = json.load(ifstream)
+		baseline = stored['results']
+		if stored.get('calibration'):
+			scale = calibration / stored['calibration']
+			print('this machine is {0:.2f}x as slow as the baseline one (Python {1}, baseline made with {2})'.format(
+				  scale, platform.python_version(), stored.get('python', 'unknown')))
+	regressions = compare(results, baseline, args.threshold, scale)
+	if args.save:
+		with open(args.save, 'w') as ofstream:
+			json.dump({'python': platform.python_version(),
+					   'calibration': calibration,
+					   'results': {name: value for name, (value, unit, calibrated) in sorted(results.items())}},
+					  ofstream, indent=4, sort_keys=True)
+			ofstream.write('\n')
+	if regressions:
+		print('{0} benchmark(s) slower than baseline by more than {1:.0f}%: {2}'.format(
+			  len(regressions), 100 * args.threshold, ', '.join(regressions)))
+		return 1
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+"""Latency of writes (posting comments) including fetches of CSRF tokens,
+against a pod answering after a delay.
+
+Usage: python -m benchmarks.connection [number of writes]
+"""
+
+
+import statistics
+import sys
+import time
+
+from diaspy import connection
+
+from benchmarks.fakepod import FakePod
+
+
+# time is spent mostly waiting for the pod, it does not depend on speed of the machine
+calibrated = False
+
+
+def writes(pod, n, token_ttl=300, rotate=False):
+	"""Returns median of seconds per write.
+	"""
+	conn = connection.Connection(pod.url, 'user', 'password', token_ttl=token_ttl, adapter=pod.adapter())
+	conn.login()
+	times = []
+	for i in range(n):
+		# pod rejects token the connection has, it has to be refetched
+		if rotate: pod.rotate_token()
+		start = time.perf_counter()
+		conn.post('posts/1/comments', data={'text': 'Comment number {0}'.format(i)})
+		times.append(time.perf_counter() - start)
+	return statistics.median(times)
+
+
+def run(n=100, latency=0.002):
+	"""Returns dict mapping benchmark names to seconds per write.
+	"""
+	pod = FakePod(latency=latency)
+	return {'connection.write.cached_token': writes(pod, n),
+			'connection.write.fetched_token': writes(pod, n, token_ttl=0),
+			'connection.write.rejected_token': writes(pod, n, rotate=True)}
+
+
+def main(n=100):
+	for name, seconds in sorted(run(n).items()):
+		print('{0:<36} {1:>10.3f} ms'.format(name, seconds * 1000))
+
+
+if __name__ == '__main__':
+	main(*[int(arg) for arg in sys.argv[1:2]])
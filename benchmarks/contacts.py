@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+"""Time needed to fetch all contacts page by page, from a pod answering
+after a delay.
+
+Usage: python -m benchmarks.contacts [number of contacts]
+"""
+
+
+import sys
+import timeit
+
+from diaspy import connection, people
+
+from benchmarks.fakepod import FakePod
+
+
+# time is spent mostly waiting for the pod, it does not depend on speed of the machine
+calibrated = False
+
+
+def run(n=500, latency=0.005, repeat=3):
+	"""Returns dict mapping benchmark names to seconds (the best of `repeat` runs).
+	"""
+	pod = FakePod(contacts=n, latency=latency)
+	contacts = people.Contacts(connection.Connection(pod.url, 'user', 'password', adapter=pod.adapter()))
+	pages = range(1, n // pod.contacts_per_page + 2)
+	results = {}
+	for name, fetch in (('contacts.get', lambda: contacts.get()),
+						('contacts.iter_contacts', lambda: list(contacts.iter_contacts())),
+						('contacts.iter_contacts.pages', lambda: list(contacts.iter_contacts(pages=pages)))):
+		results[name] = min(timeit.repeat(fetch, number=1, repeat=repeat))
+	return results
+
+
+def main(n=500):
+	for name, seconds in sorted(run(n).items()):
+		print('{0:<32} {1:>10.1f} ms'.format(name, seconds * 1000))
+
+
+if __name__ == '__main__':
+	main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+
+"""In-process stand-in diaspora* pod serving synthetic data.
+
+Serves endpoints diaspy uses (signing in, pages with CSRF token, streams
+with max_time paging, posts, comments, likes, notifications, contacts,
+conversations, people, photos and account export) with data from benchmarks.payloads,
+generated on demand so streams of any length cost no memory:
+
+	with FakePod(posts=100000, latency=0.01) as pod:
+		connection = diaspy.connection.Connection(pod.url, 'user', 'password')
+		connection.login()
+		...
+		print(pod.requests)
+
+Pod can also be used without starting server: its adapter passes requests
+of connection straight to it, without sockets:
+
+	pod = FakePod()
+	connection = diaspy.connection.Connection(pod.url, 'user', 'password', adapter=pod.adapter())
+
+Writes have to carry the CSRF token the pod hands out, otherwise they
+are answered with 422 or, like real pods do, redirected to the sign in
+page (use rotate_token() to make clients refetch it).
+New posts can be published on top of streams with publish(); first pages
+of streams carry ETag and are answered with 304 while they do not change.
+
+Usage: python -m benchmarks.fakepod [port]
+"""
+
+
+import calendar
+import collections
+import datetime
+import json
+import re
+import sys
+import threading
+import time
+import urllib.parse
+from http import server
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from diaspy import metrics
+
+from benchmarks import payloads
+
+
+# posts of n-th stream page are created this many seconds before the start of payloads
+EPOCH = calendar.timegm(datetime.datetime(2020, 1, 1).timetuple())
+
+
+class Handler(server.BaseHTTPRequestHandler):
+	"""Passes requests to the pod serving them.
+	"""
+	protocol_version = 'HTTP/1.1'
+
+	def log_message(self, format, *args):
+		pass
+
+	def _handle(self, method):
+		length = int(self.headers.get('content-length', 0))
+		body = self.rfile.read(length) if length else b''
+		status, headers, content = self.server.pod.handle(method, self.path, self.headers, body)
+		self.send_response(status)
+		for name, value in headers.items(): self.send_header(name, value)
+		self.send_header('Content-Length', str(len(content)))
+		self.end_headers()
+		if method != 'HEAD': self.wfile.write(content)
+
+	def do_GET(self): self._handle('GET')
+	def do_HEAD(self): self._handle('HEAD')
+	def do_POST(self): self._handle('POST')
+	def do_PUT(self): self._handle('PUT')
+	def do_DELETE(self): self._handle('DELETE')
+
+
+class Adapter(requests.adapters.BaseAdapter):
+	"""Transport adapter passing requests straight to the pod.
+	"""
+	def __init__(self, pod):
+		super().__init__()
+		self.pod = pod
+
+	def send(self, request, **kwargs):
+		url = urllib.parse.urlsplit(request.url)
+		path = urllib.parse.urlunsplit(('', '', url.path, url.query, ''))
+		body = request.body or b''
+		if hasattr(body, 'read'): body = body.read()
+		if isinstance(body, str): body = body.encode('utf-8')
+		status, headers, content = self.pod.handle(request.method, path, CaseInsensitiveDict(request.headers), body)
+		response = requests.Response()
+		response.status_code = status
+		response.headers = CaseInsensitiveDict(headers)
+		response.headers['Content-Length'] = str(len(content))
+		response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+		response._content = content
+		response._content_consumed = True
+		response.url = request.url
+		response.request = request
+		response.reason = server.BaseHTTPRequestHandler.responses.get(status, ('',))[0]
+		return response
+
+	def close(self):
+		pass
+
+
+class FakePod():
+	"""Stand-in diaspora* pod running in a background thread.
+	"""
+	per_page = 15
+	contacts_per_page = 25
+
+	def __init__(self, posts=1000, comments=5, notifications=100, contacts=100, conversations=20,
+				 messages=10, people=50, photos=0, photo_size=50000, latency=0, redirect_rejected=False,
+				 host='127.0.0.1', port=0):
+		"""
+		:param posts: number of posts in every stream
+		:type posts: int
+		:param comments: maximal number of comments of a post (n-th post has n % (comments + 1) of them)
+		:type comments: int
+		:param notifications: number of notifications (increase it to make new ones arrive)
+		:type notifications: int
+		:param contacts: number of contacts
+		:type contacts: int
+		:param conversations: number of conversations
+		:type conversations: int
+		:param messages: number of messages in every conversation
+		:type messages: int
+		:param people: number of people found by search
+		:type people: int
+		:param photos: maximal number of photos of a post (n-th post has n % (photos + 1) of them)
+		:type photos: int
+		:param photo_size: size of every photo in bytes
+		:type photo_size: int
+		:param latency: seconds every response is delayed by
+		:type latency: float
+		:param redirect_rejected: redirect writes with invalid CSRF token to the sign in page instead of answering with 422
+		:type redirect_rejected: bool
+		"""
+		self.posts = posts
+		self.comments = comments
+		self.notifications = notifications
+		self.contacts = contacts
+		self.conversations = conversations
+		self.messages = messages
+		self.people = people
+		self.photos = photos
+		self.photo_size = photo_size
+		self.latency = latency
+		self.redirect_rejected = redirect_rejected
+		self.token = 'ZmFrZXBvZC10b2tlbi0w'
+		self.requests = collections.Counter()
+		self.liked = set()
+		# number of posts published on top of streams (see publish())
+		self.published = 0
+		self._lock = threading.Lock()
+		self._address = (host, port)
+		self._server = None
+		# replaced with address of the server when it is started
+		self.url = 'http://fakepod.invalid'
+		self._routes = [(method, re.compile('^(?:{0})$'.format(pattern)), getattr(self, handler))
+						for method, pattern, handler in self.routes]
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *exc):
+		self.stop()
+
+	def start(self):
+		"""Starts serving requests in background thread.
+		"""
+		self._server = server.ThreadingHTTPServer(self._address, Handler)
+		self._server.daemon_threads = True
+		self._server.pod = self
+		self.url = 'http://{0}:{1}'.format(*self._server.server_address[:2])
+		threading.Thread(target=self._server.serve_forever, daemon=True).start()
+		return self
+
+	def adapter(self):
+		"""Returns transport adapter passing requests straight to the pod
+		(see diaspy.connection.Connection's `adapter` parameter).
+		"""
+		return Adapter(self)
+
+	def stop(self):
+		"""Stops the pod.
+		"""
+		self._server.shutdown()
+		self._server.server_close()
+
+	def rotate_token(self):
+		"""Changes CSRF token, so the one clients have becomes stale.
+		"""
+		with self._lock:
+			self.token = 'ZmFrZXBvZC10b2tlbi0{0}'.format(int(time.time() * 1000))
+
+	def publish(self, n=1):
+		"""Publishes n new posts on top of every stream.
+		"""
+		with self._lock:
+			self.published += n
+
+	routes = [('GET', r'users/sign_in|stream|bookmarklet|contacts|user/edit', '_page'),
+			  ('POST', r'users/sign_in', '_signin'),
+			  ('GET', r'(?:stream|activity|aspects|commented|liked|mentions|followed_tags|public|'
+					  r'tags/[^/]+|people/[^/]+/stream)\.json', '_stream'),
+			  ('GET', r'posts/([^/]+)\.json', '_post'),
+			  ('GET', r'posts/(\d+)/comments\.json', '_comments'),
+			  ('GET', r'posts/(\d+)/likes\.json', '_likes'),
+			  ('POST', r'posts/(\d+)/comments', '_comment'),
+			  ('POST', r'posts/(\d+)/likes', '_like'),
+			  ('POST', r'status_messages', '_statusmessage'),
+			  ('POST', r'photos', '_photo'),
+			  ('GET', r'uploads/images/.+', '_image'),
+			  ('GET', r'notifications\.json', '_notifications'),
+			  ('GET', r'contacts\.json', '_contacts'),
+			  ('GET', r'conversations\.json', '_conversations'),
+			  ('GET', r'conversations/(\d+)\.json', '_conversation'),
+			  ('GET', r'conversations/(\d+)', '_conversationpage'),
+			  ('GET', r'people\.json', '_search'),
+			  ('GET', r'people/([0-9a-f]+)\.json', '_person'),
+			  ('GET', r'people/([0-9a-f]+)', '_personpage'),
+			  ('GET', r'profile/edit', '_profile'),
+			  ('GET', r'user/export', '_export'),
+			  ]
+
+	def handle(self, method, path, headers, body):
+		"""Serves request.
+
+		:returns: three-tuple (status, headers, content)
+		"""
+		if self.latency: time.sleep(self.latency)
+		url = urllib.parse.urlsplit(path)
+		location = url.path.strip('/')
+		query = {key: values[-1] for key, values in urllib.parse.parse_qs(url.query).items()}
+		with self._lock:
+			self.requests[(method, metrics.endpoint(location))] += 1
+		if method != 'GET' and not self._authentic(headers, body):
+			if self.redirect_rejected: return (302, {'Location': '{0}/users/sign_in'.format(self.url)}, b'')
+			return self._json({'error': 'invalid authenticity token'}, 422)
+		for route_method, pattern, handler in self._routes:
+			match = pattern.match(location)
+			if match and route_method == method:
+				return handler(match, query, headers, body)
+		if method != 'GET': return self._json({})
+		return self._json({'error': 'not found'}, 404)
+
+	def _authentic(self, headers, body):
+		"""Returns True if write request carries valid CSRF token.
+		"""
+		token = headers.get('x-csrf-token')
+		if token is None:
+			form = urllib.parse.parse_qs(body.decode('utf-8', 'replace')) if body[:1] not in (b'{', b'[') else {}
+			token = form.get('authenticity_token', [None])[-1]
+		return token == self.token
+
+	def _json(self, data, status=200, headers=None):
+		content = json.dumps(data).replace(payloads.POD, self.url).encode('utf-8')
+		return (status, dict(headers or {}, **{'Content-Type': 'application/json; charset=utf-8'}), content)
+
+	def _html(self, text, status=200):
+		return (status, {'Content-Type': 'text/html; charset=utf-8'}, text.replace(payloads.POD, self.url).encode('utf-8'))
+
+	def _userdata(self):
+		person = payloads.person(0)
+		return {'id': 1, 'guid': person['guid'], 'name': person['name'], 'diaspora_id': person['diaspora_id'],
+				'avatar': person['avatar'], 'aspects': [{'id': 1, 'name': 'Friends'}, {'id': 2, 'name': 'Work'}]}
+
+	def _page(self, match, query, headers, body):
+		return self._html(payloads.page(self.token, self._userdata()))
+
+	def _signin(self, match, query, headers, body):
+		return (302, {'Location': '{0}/stream'.format(self.url),
+					  'Set-Cookie': '_diaspora_session=fakepod; path=/; HttpOnly'}, b'')
+
+	def _postdata(self, n):
+		if n >= 0: return payloads.post(n, comments=(n % (self.comments + 1)), photos=(n % (self.photos + 1)))
+		# published posts have negative numbers, they are not served on their own
+		data = payloads.post(n, comments=0)
+		data['id'] = self.posts - n
+		return data
+
+	def _stream(self, match, query, headers, body):
+		"""Page of posts created at or before `max_time` (seconds since epoch).
+		"""
+		if query.get('max_time'):
+			start = max(0, -(-(EPOCH - int(query['max_time'])) // 60))
+			return self._json([self._postdata(n) for n in range(start, min(start + self.per_page, self.posts))])
+		etag = '"stream-{0}"'.format(self.published)
+		if headers.get('if-none-match') == etag: return (304, {'ETag': etag}, b'')
+		start = -self.published
+		return self._json([self._postdata(n) for n in range(start, min(start + self.per_page, self.posts))],
+						  headers={'ETag': etag})
+
+	def _postnumber(self, id):
+		"""Returns number of post with given id or GUID (or None).
+		"""
+		if id.isdigit(): n = int(id) - 1
+		else:
+			try: n = int(id, 16) - 0xb0000000
+			except ValueError: return None
+		if 0 <= n < self.posts: return n
+		return None
+
+	def _post(self, match, query, headers, body):
+		n = self._postnumber(match.group(1))
+		if n is None: return self._json({'error': 'not found'}, 404)
+		etag = '"post-{0}"'.format(n)
+		if headers.get('if-none-match') == etag: return (304, {'ETag': etag}, b'')
+		return self._json(self._postdata(n), headers={'ETag': etag})
+
+	def _comments(self, match, query, headers, body):
+		n = self._postnumber(match.group(1))
+		if n is None: return self._json({'error': 'not found'}, 404)
+		return self._json([payloads.comment(i, n) for i in range(n % (self.comments + 1))])
+
+	def _likes(self, match, query, headers, body):
+		n = self._postnumber(match.group(1))
+		if n is None: return self._json({'error': 'not found'}, 404)
+		return self._json([payloads.like(i, n) for i in range(n % 7)])
+
+	def _comment(self, match, query, headers, body):
+		return self._json(payloads.comment(0, int(match.group(1))), 201)
+
+	def _like(self, match, query, headers, body):
+		n = int(match.group(1))
+		with self._lock:
+			if n in self.liked: return self._json({'error': 'Validation failed: Target has already been taken'}, 422)
+			self.liked.add(n)
+		return self._json(payloads.like(0, n), 201)
+
+	def _statusmessage(self, match, query, headers, body):
+		data = payloads.post(0)
+		data['text'] = json.loads(body.decode('utf-8'))['status_message']['text']
+		return self._json(data, 201)
+
+	def _photo(self, match, query, headers, body):
+		return self._json({'data': {'photo': payloads.photo(len(body))}})
+
+	def _image(self, match, query, headers, body):
+		content = (match.group(0).encode('utf-8') * (self.photo_size // len(match.group(0)) + 1))[:self.photo_size]
+		offset = re.match(r'bytes=(\d+)-$', headers.get('range', ''))
+		if offset is None: return (200, {'Content-Type': 'image/jpeg'}, content)
+		offset = int(offset.group(1))
+		if offset >= len(content): return (416, {'Content-Range': 'bytes */{0}'.format(len(content))}, b'')
+		return (206, {'Content-Type': 'image/jpeg',
+					  'Content-Range': 'bytes {0}-{1}/{2}'.format(offset, len(content) - 1, len(content))}, content[offset:])
+
+	def _notifications(self, match, query, headers, body):
+		per_page = int(query.get('per_page', 5))
+		start = (int(query.get('page', 1)) - 1) * per_page
+		# newest (with the highest id) first
+		notifications = [payloads.notification(self.notifications - 1 - n)
+						 for n in range(start, min(start + per_page, self.notifications))]
+		unread = self.notifications // 2
+		return self._json({'unread_count': unread,
+						   'unread_count_by_type': {'liked': unread},
+						   'notification_list': notifications})
+
+	def _contacts(self, match, query, headers, body):
+		start = (int(query.get('page', 1)) - 1) * self.contacts_per_page
+		return self._json([payloads.contact(n) for n in range(start, min(start + self.contacts_per_page, self.contacts))])
+
+	def _conversations(self, match, query, headers, body):
+		start = (int(query.get('page', 1)) - 1) * self.per_page
+		return self._json([payloads.conversation(n, self.messages)
+						   for n in range(start, min(start + self.per_page, self.conversations))])
+
+	def _conversation(self, match, query, headers, body):
+		n = int(match.group(1)) - 1
+		if not 0 <= n < self.conversations: return self._json({'error': 'not found'}, 404)
+		return self._json(payloads.conversation(n, self.messages))
+
+	def _conversationpage(self, match, query, headers, body):
+		n = int(match.group(1)) - 1
+		if not 0 <= n < self.conversations: return self._html('', 404)
+		return self._html(payloads.conversation_page(n, self.messages))
+
+	def _search(self, match, query, headers, body):
+		return self._json([payloads.person(n) for n in range(self.people)])
+
+	def _person(self, match, query, headers, body):
+		return self._json(payloads.person(int(match.group(1), 16) - 0xa000))
+
+	def _personpage(self, match, query, headers, body):
+		return self._html(payloads.person_page())
+
+	def _profile(self, match, query, headers, body):
+		return self._html(payloads.profile_edit())
+
+	def _export(self, match, query, headers, body):
+		return (200, {'Content-Type': 'application/xml; charset=utf-8'},
+				payloads.export(self.posts, self.comments, self.contacts).encode('utf-8'))
+
+
+def main(port=8000):
+	pod = FakePod(port=port).start()
+	print('serving fake pod at {0} (press Ctrl+C to stop)'.format(pod.url))
+	try:
+		while True: time.sleep(3600)
+	except KeyboardInterrupt:
+		pod.stop()
+
+
+if __name__ == '__main__':
+	main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+"""Time needed to import diaspy and its modules in a fresh interpreter,
+and heavy dependencies imported with them.
+
+Usage: python -m benchmarks.imports [number of imports]
+"""
+
+
+import subprocess
+import sys
+
+
+# dependencies which are slow to import and are imported on first use
+HEAVY = ('aiohttp', 'asyncio', 'bs4', 'dateutil', 'requests')
+
+_code = '''
+import sys, time
+started = time.perf_counter()
+import {0}
+print(time.perf_counter() - started)
+print(' '.join(name for name in {1!r} if name in sys.modules))
+'''
+
+
+def measure(module, n=5):
+	"""Returns shortest time (in seconds) of n imports of module and
+	names of heavy dependencies imported with it.
+	"""
+	times = []
+	for i in range(n):
+		output = subprocess.check_output([sys.executable, '-c', _code.format(module, HEAVY)], universal_newlines=True)
+		seconds, imported = output.split('\n')[:2]
+		times.append(float(seconds))
+	return (min(times), imported.split())
+
+
+def run(n=5):
+	"""Returns dict mapping benchmark names to seconds per import.
+	"""
+	return {'imports.{0}'.format(module): measure(module, n)[0]
+			for module in ('diaspy', 'diaspy.streams', 'diaspy.connection', 'diaspy.settings')}
+
+
+def main(n=5):
+	for name, seconds in sorted(run(n).items()):
+		print('{0:<24} {1:>10.1f} ms'.format(name, seconds * 1000))
+
+
+if __name__ == '__main__':
+	main(*[int(arg) for arg in sys.argv[1:2]])
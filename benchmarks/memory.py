@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+"""Memory overhead of objects diaspy keeps in long-lived streams.
+
+Compares slotted Post, Comment, Notification and User classes with
+their dict-backed equivalents (what they were before using __slots__).
+Data sent by pod is built beforehand, so only the overhead of wrapping
+objects is measured.
+
+Usage: python -m benchmarks.memory [number of objects]
+"""
+
+
+import gc
+import sys
+import tracemalloc
+
+from diaspy import models, people
+
+from benchmarks import payloads
+
+
+unit = 'B'
+
+
+def unslotted(cls):
+	"""Returns dict-backed copy of slotted class.
+	"""
+	skip = set(cls.__slots__) | {'__slots__', '__dict__', '__weakref__'}
+	namespace = {k: v for k, v in cls.__dict__.items() if k not in skip}
+	return type(cls.__name__, (object,), namespace)
+
+
+def measure(factory, n):
+	"""Returns average number of bytes allocated by factory(i) for i in range(n).
+	"""
+	gc.collect()
+	tracemalloc.start()
+	before = tracemalloc.get_traced_memory()[0]
+	objects = [factory(i) for i in range(n)]
+	after = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	del objects
+	return (after - before) / n
+
+
+def factories(n):
+	"""Returns dict mapping class names to (class, factory) pairs.
+	Payloads for factories are built here so they are not measured.
+	"""
+	posts = [payloads.post(i) for i in range(n)]
+	comments = [payloads.comment(i) for i in range(n)]
+	notifications = [payloads.notification(i) for i in range(n)]
+	users = [{'person': payloads.person(i)} for i in range(n)]
+	return {
+		'Post': (models.Post, lambda cls: lambda i: cls(None, id=posts[i]['id'], guid=posts[i]['guid'],
+														fetch=False, comments=False, post_data=posts[i])),
+		'Comment': (models.Comment, lambda cls: lambda i: cls(comments[i])),
+		'Notification': (models.Notification, lambda cls: lambda i: cls(None, notifications[i])),
+		'User': (people.User, lambda cls: lambda i: cls(None, guid=users[i]['person']['guid'], fetch='', data=users[i])),
+	}
+
+
+def run(n=10000):
+	"""Returns dict mapping benchmark names to bytes per object.
+	"""
+	results = {}
+	for name, (cls, factory) in factories(n).items():
+		results['memory.{0}.dict'.format(name)] = measure(factory(unslotted(cls)), n)
+		results['memory.{0}.slots'.format(name)] = measure(factory(cls), n)
+	return results
+
+
+def main(n=10000):
+	results = run(n)
+	print('{0:<14} {1:>12} {2:>12} {3:>8}'.format('bytes/object', '__dict__', '__slots__', 'saved'))
+	for name in ('Post', 'Comment', 'Notification', 'User'):
+		before = results['memory.{0}.dict'.format(name)]
+		after = results['memory.{0}.slots'.format(name)]
+		print('{0:<14} {1:>12.1f} {2:>12.1f} {3:>7.1f}%'.format(name, before, after, 100 * (before - after) / before))
+
+
+if __name__ == '__main__':
+	main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+"""Time needed to parse data sent by pods: HTML of notifications and
+messages of conversations (with BeautifulSoup and with regular
+expressions) and timestamps of posts.
+
+Usage: python -m benchmarks.parsing [number of notifications]
+"""
+
+
+import sys
+import timeit
+
+from diaspy import connection, models, streams
+
+from benchmarks import payloads
+from benchmarks.fakepod import FakePod
+
+
+def parsers():
+	"""Returns names of available HTML parsing paths.
+	"""
+	try:
+		import bs4
+	except ImportError:
+		return ('regex',)
+	return ('bs4', 'regex')
+
+
+def notifications(data, parser):
+	"""Returns seconds needed to parse one notification.
+	"""
+	support = models.BS4_SUPPORT
+	models.BS4_SUPPORT = (parser == 'bs4')
+	try:
+		def parse():
+			models.Notification.parseall([models.Notification(None, each) for each in data])
+		return min(timeit.repeat(parse, number=1, repeat=3)) / len(data)
+	finally:
+		models.BS4_SUPPORT = support
+
+
+def messages(conversation, parser, n):
+	"""Returns seconds needed to fetch and parse messages of a conversation.
+	"""
+	support = models.BS4_SUPPORT
+	models.BS4_SUPPORT = (parser == 'bs4')
+	try:
+		return min(timeit.repeat(conversation._fetch_messages, number=n, repeat=7)) / n
+	finally:
+		models.BS4_SUPPORT = support
+
+
+def run(n=1000):
+	"""Returns dict mapping benchmark names to seconds per item.
+	"""
+	results = {}
+	data = [payloads.notification(i) for i in range(n)]
+	pod = FakePod(conversations=1, messages=50)
+	conversation = models.Conversation(connection.Connection(pod.url, 'user', 'password', adapter=pod.adapter()), 1, fetch=False)
+	for parser in parsers():
+		results['parsing.notification.{0}'.format(parser)] = notifications(data, parser)
+		results['parsing.conversation.{0}'.format(parser)] = messages(conversation, parser, max(1, n // 50))
+	timestamps = [payloads.timestamp(i) for i in range(n)]
+	results['parsing.timestamp'] = min(timeit.repeat(lambda: [streams.parse_utc_timestamp(each) for each in timestamps],
+												   number=1, repeat=3)) / n
+	return results
+
+
+def main(n=1000):
+	for name, seconds in sorted(run(n).items()):
+		print('{0:<32} {1:>10.1f} us'.format(name, seconds * 1000000))
+
+
+if __name__ == '__main__':
+	main(*[int(arg) for arg in sys.argv[1:2]])
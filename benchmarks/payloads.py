@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+
+"""Synthetic payloads shaped like the JSON and HTML sent by diaspora* pods.
+"""
+
+
+import datetime
+import json
+from xml.sax.saxutils import escape
+
+
+# URL of the pod payloads point to
+POD = 'https://pod.example.com'
+
+def person(n):
+	"""Returns author-like data of n-th person.
+	"""
+	guid = '{0:016x}'.format(0xa000 + n)
+	return {'id': n,
+			'guid': guid,
+			'name': 'Person {0}'.format(n),
+			'diaspora_id': 'person{0}@pod.example.com'.format(n),
+			'avatar': {'small': '{0}/uploads/images/thumb_small_{1}.jpg'.format(POD, guid),
+					   'medium': '{0}/uploads/images/thumb_medium_{1}.jpg'.format(POD, guid),
+					   'large': '{0}/uploads/images/thumb_large_{1}.jpg'.format(POD, guid)}}
+
+
+def timestamp(n, start=datetime.datetime(2020, 1, 1)):
+	"""Returns UTC timestamp n minutes before `start`.
+	"""
+	return (start - datetime.timedelta(minutes=n)).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def comment(n, post=0):
+	"""Returns data of n-th comment of a post.
+	"""
+	return {'id': post * 1000 + n,
+			'guid': '{0:016x}'.format(0xc0000000 + post * 1000 + n),
+			'text': 'Comment number {0} with some **markdown** and a #tag.'.format(n),
+			'author': person(n % 50),
+			'created_at': timestamp(n)}
+
+
+def post(n, comments=2, photos=0):
+	"""Returns data of n-th post (newer posts have lower numbers).
+	"""
+	guid = '{0:016x}'.format(0xb0000000 + n)
+	return {'id': n + 1,
+			'guid': guid,
+			'text': 'Post number {0}. '.format(n) + 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 4,
+			'public': True,
+			'created_at': timestamp(n),
+			'interacted_at': timestamp(n),
+			'provider_display_name': None,
+			'post_type': 'StatusMessage',
+			'image_url': None,
+			'object_url': None,
+			'nsfw': False,
+			'author': person(n % 100),
+			'o_embed_cache': None,
+			'open_graph_cache': None,
+			'mentioned_people': [],
+			'photos': [photo(n, i) for i in range(photos)],
+			'root': None,
+			'title': 'Post number {0}.'.format(n),
+			'address': None,
+			'poll': None,
+			'already_participated_in_poll': None,
+			'participation': True,
+			'interactions': {'likes': [],
+							 'reshares': [],
+							 'comments_count': comments,
+							 'likes_count': n % 7,
+							 'reshares_count': n % 3,
+							 'comments': [comment(i, n) for i in range(min(comments, 3))]}}
+
+
+def photo(n, i=0):
+	"""Returns data of i-th photo attached to n-th post.
+	"""
+	guid = '{0:016x}'.format(0xd0000000 + n * 10 + i)
+	return {'id': n * 10 + i,
+			'guid': guid,
+			'dimensions': {'height': 768, 'width': 1024},
+			'sizes': {size: '{0}/uploads/images/{1}_{2}.jpg'.format(POD, size, guid)
+					  for size in ('small', 'medium', 'large')}}
+
+
+def notification(n, kind='liked'):
+	"""Returns data of n-th notification (as found in notification_list).
+	"""
+	actor = person(n % 20)
+	note_html = ('<div class="media stream-element unread" data-guid="{0}" data-type="Notifications::Liked">'
+				 '<div class="unread-toggle pull-right"><i class="entypo-eye"></i></div>'
+				 '<div class="media-object pull-left">'
+				 '<a href="/people/{1}" class="hovercardable" data-hovercard="/people/{1}">'
+				 '<img class="avatar" src="{2}" title="{3}" /></a></div>'
+				 '<div class="media-body">'
+				 '<a href="/people/{1}" class="hovercardable" data-hovercard="/people/{1}">{3}</a> '
+				 'liked your post <a href="/posts/{4}" data-ref="{4}">Post number {4}.</a>'
+				 '<div class="notification_date"><i class="entypo-heart"></i>'
+				 '<time datetime="{5}" title="{5}"></time></div></div></div>'
+				 ).format(n, actor['guid'], actor['avatar']['small'], actor['name'], n + 1, timestamp(n))
+	return {kind: {'id': n + 1,
+				   'target_type': 'Post',
+				   'target_id': n + 1,
+				   'recipient_id': 1,
+				   'unread': bool(n % 2),
+				   'created_at': timestamp(n),
+				   'updated_at': timestamp(n),
+				   'note_html': note_html},
+			'type': kind}
+
+
+def like(n, post=0):
+	"""Returns data of n-th like of a post.
+	"""
+	return {'id': post * 1000 + n,
+			'guid': '{0:016x}'.format(0xe0000000 + post * 1000 + n),
+			'author': person(n % 50),
+			'created_at': timestamp(n)}
+
+
+def conversation(n, messages=10):
+	"""Returns data of n-th conversation (as found in conversations.json).
+	"""
+	return {'conversation': {'id': n + 1,
+							 'guid': '{0:016x}'.format(0xf0000000 + n),
+							 'subject': 'Conversation number {0}'.format(n),
+							 'created_at': timestamp(n),
+							 'updated_at': timestamp(n),
+							 'author_id': n % 20,
+							 'messages_count': messages,
+							 'participants': [person(n % 20), person(0)]}}
+
+
+def conversation_page(n, messages=10):
+	"""Returns HTML of conversations/{id} page of n-th conversation.
+	"""
+	def message(i):
+		author = person(i % 2 and n % 20)
+		return ("<div class='stream-element message' data-guid='{0}'>\n"
+				"<a href='/people/{1}' class='img'><img alt='{2}' class='avatar' src='{3}' title='{2}'></a>\n"
+				"<div class='content'><time class='timeago' datetime='{4}'></time>\n"
+				"<div class='message-content'>\n<p>Message number {5} of conversation {6}.</p>\n</div>\n"
+				"</div></div>\n"
+				).format(n * 1000 + i, author['guid'], author['name'], author['avatar']['small'],
+						 timestamp(messages - i).replace('.000Z', 'Z'), i, n)
+	return ("<html><body><div class='conversation'><h3>Conversation number {0}</h3>"
+			"<div class='stream'>{1}<div class='stream-element new-message'>"
+			"<form action='/conversations/{2}/messages'></form></div></div></div></body></html>"
+			).format(n, ''.join([message(i) for i in range(messages)]), n + 1)
+
+
+def page(token, userdata):
+	"""Returns HTML of a page carrying CSRF token and data of current user
+	(e.g. stream or bookmarklet).
+	"""
+	return ('<!DOCTYPE html><html><head><meta name="csrf-param" content="authenticity_token" />'
+			'<meta name="csrf-token" content="{0}" /></head><body>'
+			'<script>window.current_user_attributes = {1}</script></body></html>'
+			).format(token, json.dumps(userdata))
+
+
+def contact(n):
+	"""Returns data of n-th contact (as found in contacts.json).
+	"""
+	data = person(n)
+	return {'id': n,
+			'person_id': n,
+			'person': {'id': n, 'guid': data['guid'], 'diaspora_id': data['diaspora_id'], 'name': data['name']},
+			'name': data['name'],
+			'guid': data['guid'],
+			'diaspora_id': data['diaspora_id'],
+			'avatar': data['avatar']['small'],
+			'url': '/people/{0}'.format(data['guid']),
+			'aspect_memberships': [{'id': n, 'aspect': {'id': 1, 'name': 'Friends'}}]}
+
+
+def profile_edit(first='Foo', last='Bar', bio='Lorem ipsum dolor sit amet.', location='Nowhere',
+				 gender='Gender', birth=(1990, 9, 7), searchable=True, nsfw=False):
+	"""Returns HTML of profile/edit page (with the usual layout around the form).
+	"""
+	def options(values, chosen, label=str):
+		return ''.join(['<option {0}value="{1}">{2}</option>'.format(
+						('selected="selected" ' if value == chosen else ''), value, label(value)) for value in values])
+
+	def checkbox(name, checked):
+		return ('<input name="profile[{0}]" type="hidden" value="0" />'
+				'<input {1}id="profile_{0}" name="profile[{0}]" type="checkbox" value="true" />'
+				).format(name, ('checked="checked" ' if checked else ''))
+
+	months = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+			  'August', 'September', 'October', 'November', 'December']
+	head = ('<!DOCTYPE html><html><head><meta charset="utf-8" />'
+			'<meta name="csrf-param" content="authenticity_token" />'
+			'<meta name="csrf-token" content="c3JmLXRva2Vu" />'
+			'<title>diaspora* | Edit profile</title>'
+			+ ''.join(['<link href="/assets/style-{0}.css" rel="stylesheet" />'.format(i) for i in range(8)])
+			+ '<script>window.gon={};gon.user={"id":1,"guid":"abc"};gon.preloads={};</script>'
+			+ '</head>')
+	navigation = ('<header><nav class="navbar"><ul class="nav">'
+				  + ''.join(['<li><a href="/aspects/{0}" class="aspect-link">Aspect {0}</a></li>'.format(i) for i in range(40)])
+				  + '</ul></nav></header>')
+	form = ('<div class="container"><div class="row"><div class="col-md-9">'
+			'<form accept-charset="UTF-8" action="/profile" class="edit_profile" id="update_profile_form" method="post">'
+			'<input name="utf8" type="hidden" value="&#x2713;" /><input name="_method" type="hidden" value="put" />'
+			'<h3>Your name</h3>'
+			'<input id="profile_first_name" name="profile[first_name]" type="text" value="{first}" />'
+			'<input id="profile_last_name" name="profile[last_name]" type="text" value="{last}" />'
+			'<h3>Your tags</h3><input id="profile_tag_string" name="profile[tag_string]" type="text" value="" />'
+			'<h3>Your bio</h3>'
+			'<textarea id="profile_bio" name="profile[bio]" placeholder="Fill me out" rows="5">\n{bio}</textarea>'
+			'<h3>Your location</h3>'
+			'<input id="profile_location" name="profile[location]" placeholder="Fill me out" type="text" value="{location}" />'
+			'<h3>Your gender</h3>'
+			'<input id="profile_gender" name="profile[gender]" placeholder="Fill me out" type="text" value="{gender}" />'
+			'<h3>Your birthday</h3>'
+			'<select id="profile_date_year" name="profile[date][year]"><option value=""></option>{years}</select>'
+			'<select id="profile_date_month" name="profile[date][month]"><option value=""></option>{months}</select>'
+			'<select id="profile_date_day" name="profile[date][day]"><option value=""></option>{days}</select>'
+			'<h3>Searchable</h3>{searchable}<h3>NSFW</h3>{nsfw}'
+			'<input class="btn btn-primary" name="commit" type="submit" value="Update profile" />'
+			'</form></div></div></div>'
+			).format(first=first, last=last, bio=bio, location=location, gender=gender,
+					 years=options(range(2020, 1900, -1), birth[0]),
+					 months=options(range(1, 13), birth[1], lambda m: months[m - 1]),
+					 days=options(range(1, 32), birth[2]),
+					 searchable=checkbox('searchable', searchable), nsfw=checkbox('nsfw', nsfw))
+	footer = ('<footer>'
+			  + ''.join(['<script src="/assets/application-{0}.js"></script>'.format(i) for i in range(10)])
+			  + '</footer></body></html>')
+	return head + '<body>' + navigation + form + footer
+
+
+def person_page(tags=('movies', 'kittens', 'travel', 'teacher', 'newyork')):
+	"""Returns HTML of people/{guid} page (only the parts diaspy reads).
+	"""
+	return ('<html><head><meta name="keywords" content="{0}" /></head><body>{1}</body></html>'
+			).format(', '.join(tags), ''.join(['<a href="/tags/{0}" class="tag">#{0}</a>'.format(tag) for tag in tags]))
+
+
+def export(posts=10, comments=5, contacts=5):
+	"""Returns XML of account export (user/export) with given number of
+	posts (n-th post has n % (comments + 1) comments) and contacts.
+	"""
+	def element(tag, *children):
+		return '<{0}>{1}</{0}>'.format(tag, ''.join(children))
+
+	def text(tag, value):
+		return element(tag, escape(str(value)))
+
+	user = person(0)
+	aspects = [element('aspect', text('name', name)) for name in ('Friends', 'Work')]
+	people = [element('contact', text('person_guid', person(n)['guid']), text('person_name', person(n)['name']),
+					  element('aspects', element('aspect', text('name', 'Friends'))))
+			  for n in range(1, contacts + 1)]
+	statuses = [element('status_message', text('guid', post(n)['guid']), text('text', post(n)['text']),
+						text('public', 'true'), text('created_at', timestamp(n)))
+				for n in range(posts)]
+	remarks = [element('comment', text('guid', comment(i, n)['guid']), text('post_guid', post(n)['guid']),
+					   text('text', comment(i, n)['text']))
+			   for n in range(posts) for i in range(n % (comments + 1))]
+	return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+			+ element('XML', element('user', text('username', user['diaspora_id'].split('@')[0]), text('name', user['name'])),
+					  element('aspects', *aspects), element('contacts', *people),
+					  element('posts', *statuses), element('comments', *remarks)))
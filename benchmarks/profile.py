@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+"""Time needed to load settings.Profile from a realistic profile/edit page.
+
+Usage: python -m benchmarks.profile [number of loads]
+"""
+
+
+import sys
+import timeit
+
+from diaspy import settings
+
+from benchmarks import payloads
+
+
+class Response():
+	def __init__(self, text):
+		self.text = text
+		self.status_code = 200
+
+
+class Connection():
+	"""Stand-in connection serving pages Profile reads.
+	"""
+	pages = {'profile/edit': payloads.profile_edit(),
+			 'people/abc': payloads.person_page()}
+
+	def get(self, string, **kwargs):
+		return Response(self.pages[string])
+
+	def getUserData(self):
+		return {'guid': 'abc'}
+
+
+def run(n=200):
+	"""Returns dict mapping benchmark names to seconds per call.
+	"""
+	connection = Connection()
+	profile = settings.Profile(connection, no_load=True)
+
+	def load():
+		profile._fields = None
+		profile.load()
+
+	return {'profile.load': min(timeit.repeat(load, number=n, repeat=3)) / n,
+			'profile.init_and_load': min(timeit.repeat(lambda: settings.Profile(connection), number=n, repeat=3)) / n}
+
+
+def main(n=200):
+	for name, seconds in sorted(run(n).items()):
+		print('{0:<24} {1:>10.3f} ms'.format(name, seconds * 1000))
+
+
+if __name__ == '__main__':
+	main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+"""Time needed to walk through whole streams and to merge pages into them.
+
+Streams are served by benchmarks.fakepod without sockets, so the time is
+spent in diaspy (and requests) only.
+
+Usage: python -m benchmarks.streams
+"""
+
+
+import time
+import timeit
+
+from diaspy import connection, models, streams
+
+from benchmarks import payloads
+from benchmarks.fakepod import FakePod
+
+
+def full(posts):
+	"""Returns seconds needed by Generic.full() on stream of given length.
+	"""
+	# up to 3 comments are embedded in posts so no comments are fetched
+	pod = FakePod(posts=posts, comments=3)
+	conn = connection.Connection(pod.url, 'user', 'password', adapter=pod.adapter())
+	stream = streams.Stream(conn, fetch=False)
+	start = time.perf_counter()
+	stream.fill()
+	stream.full()
+	return time.perf_counter() - start
+
+
+def page(first, size=15):
+	"""Returns list of posts with numbers from first to first+size.
+	"""
+	return [models.Post(None, id=data['id'], guid=data['guid'], fetch=False, comments=False, post_data=data)
+			for data in [payloads.post(n) for n in range(first, first + size)]]
+
+
+def merge(length, n):
+	"""Returns seconds needed to merge a page of new posts (_update())
+	and of older posts (_expand()) into stream of given length.
+	"""
+	stream = streams.Generic(None, fetch=False)
+	stream._expand(page(0, length))
+	newer = [page(-(i + 1) * 15) for i in range(n)]
+	older = [page(length + i * 15) for i in range(n)]
+	newer.reverse()
+	update = timeit.timeit(lambda: stream._update(newer.pop()), number=n) / n
+	expand = timeit.timeit(lambda: stream._expand(older.pop()), number=n) / n
+	return (update, expand)
+
+
+def run(sizes=(10000,), length=10000, n=500, large=False):
+	"""Returns dict mapping benchmark names to seconds.
+
+	:param large: also walk through stream of 100000 posts (it takes tens of seconds)
+	:type large: bool
+	"""
+	results = {}
+	if large: sizes = tuple(sizes) + (100000,)
+	for size in sizes:
+		results['streams.full.{0}'.format(size)] = full(size)
+	results['streams.update'], results['streams.expand'] = merge(length, n)
+	return results
+
+
+def main():
+	for name, seconds in sorted(run().items()):
+		print('{0:<24} {1:>12.3f} ms'.format(name, seconds * 1000))
+
+
+if __name__ == '__main__':
+	main()
@@ -1,13 +1,42 @@
 # flake8: noqa
 
-import diaspy.connection as connection
-import diaspy.models as models
-import diaspy.streams as streams
-import diaspy.conversations as messages
-import diaspy.conversations as conversations
-import diaspy.people as people
-import diaspy.notifications as notifications
-import diaspy.settings as settings
+"""Submodules are imported on first access, e.g. `diaspy.streams`
+imports diaspy.streams (and what it needs) when it is used for the
+first time, so importing diaspy is cheap.
+"""
+
+import importlib
+
+
+# names of attributes mapped to submodules they are imported from
+_submodules = {
+	'connection': 'connection',
+	'models': 'models',
+	'streams': 'streams',
+	'messages': 'conversations',
+	'conversations': 'conversations',
+	'people': 'people',
+	'notifications': 'notifications',
+	'settings': 'settings',
+	'search': 'search',
+	'errors': 'errors',
+	'cache': 'cache',
+	'ratelimit': 'ratelimit',
+	'metrics': 'metrics',
+	'cassette': 'cassette',
+	'concurrency': 'concurrency',
+}
+
+
+def __getattr__(name):
+	if name not in _submodules: raise AttributeError('module {0!r} has no attribute {1!r}'.format(__name__, name))
+	module = importlib.import_module('{0}.{1}'.format(__name__, _submodules[name]))
+	globals()[name] = module
+	return module
+
+
+def __dir__():
+	return sorted(set(globals()) | set(_submodules))
 
 
 __version__ = '0.6.0'
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+"""This module provides persistent cache of posts.
+
+Cache is attached to connection and used by diaspy.models.Post and
+diaspy.streams.Generic objects created with it:
+
+	connection.set_post_cache(diaspy.cache.PostCache('posts.sqlite'))
+
+Post data is revalidated with ETag/Last-Modified headers so unchanged
+posts are not downloaded again, and comments are reused as long as
+comments counter of the post does not change.
+"""
+
+
+import json
+import sqlite3
+import threading
+import time
+
+
+class PostCache():
+	"""SQLite-backed cache of post data and comments keyed by GUID.
+
+	Can be shared between threads.
+	"""
+	def __init__(self, path=':memory:'):
+		"""
+		:param path: path to database file (by default the cache lives in memory)
+		:type path: str
+		"""
+		self._db = sqlite3.connect(path, check_same_thread=False)
+		self._lock = threading.Lock()
+		with self._lock, self._db:
+			self._db.execute('CREATE TABLE IF NOT EXISTS posts ('
+							'guid TEXT PRIMARY KEY, '
+							'data TEXT NOT NULL, '
+							'etag TEXT, '
+							'last_modified TEXT, '
+							'comments TEXT, '
+							'comments_count INTEGER, '
+							'updated REAL)')
+
+	def __len__(self):
+		with self._lock:
+			return self._db.execute('SELECT COUNT(*) FROM posts').fetchone()[0]
+
+	def __contains__(self, guid):
+		with self._lock:
+			return self._db.execute('SELECT 1 FROM posts WHERE guid = ?', (guid,)).fetchone() is not None
+
+	def get(self, guid):
+		"""Returns cached entry for post with given GUID or None.
+
+		Entry is a dict with keys: `data`, `etag`, `last_modified`,
+		`comments` (list or None) and `comments_count`.
+		"""
+		with self._lock:
+			row = self._db.execute('SELECT data, etag, last_modified, comments, comments_count '
+									'FROM posts WHERE guid = ?', (guid,)).fetchone()
+		if row is None: return None
+		data, etag, last_modified, comments, comments_count = row
+		return {'data': json.loads(data),
+				'etag': etag,
+				'last_modified': last_modified,
+				'comments': (json.loads(comments) if comments is not None else None),
+				'comments_count': comments_count}
+
+	def put(self, data, etag=None, last_modified=None):
+		"""Stores post data together with validators it was sent with.
+		Cached comments of the post are kept.
+
+		:param data: post data as sent by pod
+		:type data: dict
+		"""
+		self.putmany([data], etag=etag, last_modified=last_modified)
+
+	def putmany(self, posts, etag=None, last_modified=None):
+		"""Stores data of many posts at once (e.g. a page of a stream).
+
+		Validators stored before describe the data they were sent with,
+		so if no new ones are given they are kept only for unchanged data
+		(stream pages represent posts differently than posts/{guid}.json).
+		"""
+		now = time.time()
+		rows = [(post['guid'], json.dumps(post), etag, last_modified, now) for post in posts]
+		with self._lock, self._db:
+			self._db.executemany('INSERT INTO posts (guid, data, etag, last_modified, updated) '
+								'VALUES (?, ?, ?, ?, ?) '
+								'ON CONFLICT(guid) DO UPDATE SET data = excluded.data, '
+								'etag = ' + self._validator('etag') + ', '
+								'last_modified = ' + self._validator('last_modified') + ', '
+								'updated = excluded.updated', rows)
+
+	def _validator(self, column):
+		"""Returns SQL expression of validator stored when post is updated:
+		the new one or, if there is none, the old one if data did not change.
+		"""
+		return ('CASE WHEN excluded.{0} IS NOT NULL THEN excluded.{0} '
+				'WHEN posts.data = excluded.data THEN posts.{0} END').format(column)
+
+	def comments(self, guid, comments_count):
+		"""Returns cached comments of post with given GUID if they were
+		stored for the same comments counter, None otherwise.
+		"""
+		with self._lock:
+			row = self._db.execute('SELECT comments, comments_count FROM posts WHERE guid = ?', (guid,)).fetchone()
+		if row is None or row[0] is None or row[1] != comments_count: return None
+		return json.loads(row[0])
+
+	def putcomments(self, guid, comments, comments_count):
+		"""Stores comments of post with given GUID.
+		Post itself has to be already cached.
+		"""
+		with self._lock, self._db:
+			self._db.execute('UPDATE posts SET comments = ?, comments_count = ?, updated = ? WHERE guid = ?',
+							(json.dumps(comments), comments_count, time.time(), guid))
+
+	def remove(self, guid):
+		"""Removes post with given GUID from cache.
+		"""
+		with self._lock, self._db:
+			self._db.execute('DELETE FROM posts WHERE guid = ?', (guid,))
+
+	def clear(self):
+		"""Removes all posts from cache.
+		"""
+		with self._lock, self._db:
+			self._db.execute('DELETE FROM posts')
+
+	def close(self):
+		"""Closes database.
+		"""
+		with self._lock:
+			self._db.close()
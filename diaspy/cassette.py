@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+
+"""This module provides recording of requests sent by connections and
+replaying them later without network access.
+
+Connection given a cassette in 'record' mode stores every response it
+gets from the pod in a file:
+
+	with diaspy.cassette.Cassette('crawl.cassette', 'record') as cassette:
+		connection = diaspy.connection.Connection(pod, username, password, cassette=cassette)
+		...
+
+Connection given the same file in 'replay' mode gets the responses from
+it instead of the pod:
+
+	cassette = diaspy.cassette.Cassette('crawl.cassette', speed=1)
+	connection = diaspy.connection.Connection(pod, username, password, cassette=cassette)
+
+Requests are matched on method, path (without pod) and query parameters.
+Responses to the same request are replayed in the order they were
+recorded, the last one is repeated when there are no more of them.
+
+Cassettes are gzipped JSON lines, one line per response. Bodies of
+requests are not recorded (they contain passwords and tokens) but bodies
+and headers of responses are, so cassettes contain session cookies.
+"""
+
+
+import base64
+import gzip
+import json
+import threading
+import time
+import urllib.parse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from diaspy import errors
+
+
+VERSION = 1
+
+# headers describing encoding of the body on the wire, it is stored decoded
+_skipped_headers = ('content-encoding', 'content-length', 'transfer-encoding')
+
+
+def key(method, url, ignore=()):
+	"""Returns key by which requests are matched: method, normalised
+	path (without pod, slashes collapsed) and sorted query parameters.
+
+	:param ignore: names of parameters left out of the key
+	:type ignore: tuple
+
+	>>> key('get', 'https://pod.example.com//stream.json?max_time=10&a=1')
+	('GET', 'stream.json', (('a', '1'), ('max_time', '10')))
+	"""
+	url = urllib.parse.urlsplit(url)
+	path = '/'.join(segment for segment in url.path.split('/') if segment)
+	query = urllib.parse.parse_qsl(url.query, keep_blank_values=True)
+	params = tuple(sorted(pair for pair in query if pair[0] not in ignore))
+	return (method.upper(), path, params)
+
+
+class Adapter(requests.adapters.BaseAdapter):
+	"""Transport adapter recording responses to cassette or replaying them from it.
+	"""
+	def __init__(self, cassette, inner=None):
+		super().__init__()
+		self.cassette = cassette
+		self.inner = inner
+
+	def send(self, request, **kwargs):
+		if self.inner is None: return self.cassette.play(request)
+		started = time.perf_counter()
+		response = self.inner.send(request, **kwargs)
+		# body has to be read to be recorded, streamed responses are read here too
+		response.content
+		self.cassette.record(request, response, time.perf_counter() - started)
+		return response
+
+	def close(self):
+		if self.inner is not None: self.inner.close()
+
+
+class Cassette():
+	"""File with responses recorded from a pod.
+
+	Can be shared between threads and connections.
+	"""
+	# parameters that differ between runs and are not matched (`_` is timestamp busting caches)
+	ignored_params = ('_',)
+
+	def __init__(self, path, mode='replay', speed=None):
+		"""
+		:param path: path of cassette file
+		:type path: str
+		:param mode: 'record' (file is overwritten) or 'replay'
+		:type mode: str
+		:param speed: when replaying, responses are delayed by their recorded latency divided by speed
+			(1 means original timings, None means no delays)
+		:type speed: float
+		"""
+		if mode not in ('record', 'replay'): raise ValueError('invalid cassette mode: {0}'.format(mode))
+		self.path = path
+		self.mode = mode
+		self.speed = speed
+		self._lock = threading.Lock()
+		self._file = None
+		self._responses = {}
+		if mode == 'record':
+			self._file = gzip.open(path, 'wt', encoding='utf-8')
+			self._write({'version': VERSION})
+		else:
+			self._load()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def __len__(self):
+		"""Returns number of responses available for replay.
+		"""
+		return sum(len(responses) for responses in self._responses.values())
+
+	def adapter(self, inner=None):
+		"""Returns transport adapter for connection.
+
+		:param inner: adapter sending requests to the pod when recording
+		:type inner: requests.adapters.HTTPAdapter
+		"""
+		if self.mode == 'replay': inner = None
+		elif inner is None: inner = requests.adapters.HTTPAdapter()
+		return Adapter(self, inner)
+
+	def close(self):
+		"""Closes cassette file (recorded responses are flushed to disk).
+		"""
+		with self._lock:
+			if self._file is not None:
+				self._file.close()
+				self._file = None
+
+	def _write(self, entry):
+		self._file.write(json.dumps(entry, separators=(',', ':'), ensure_ascii=False))
+		self._file.write('\n')
+
+	def _load(self):
+		"""Reads recorded responses.
+		"""
+		with gzip.open(self.path, 'rt', encoding='utf-8') as ifstream:
+			header = json.loads(ifstream.readline() or '{}')
+			if header.get('version') != VERSION:
+				raise errors.CassetteError('{0}: unsupported cassette version: {1}'.format(self.path, header.get('version')))
+			for line in ifstream:
+				entry = json.loads(line)
+				self._responses.setdefault(key(entry['method'], entry['url'], self.ignored_params), []).append(entry)
+		for responses in self._responses.values(): responses.reverse()
+
+	def record(self, request, response, elapsed):
+		"""Stores response to request.
+
+		:param elapsed: latency of the response in seconds
+		:type elapsed: float
+		"""
+		entry = {'method': request.method,
+				 'url': request.url,
+				 'status': response.status_code,
+				 'reason': response.reason,
+				 'headers': {name: value for name, value in response.headers.items() if name.lower() not in _skipped_headers},
+				 'elapsed': round(elapsed, 6)}
+		try:
+			entry['text'] = response.content.decode('utf-8')
+		except UnicodeDecodeError:
+			entry['base64'] = base64.b64encode(response.content).decode('ascii')
+		with self._lock:
+			if self._file is None: raise errors.CassetteError('{0}: cassette is closed'.format(self.path))
+			self._write(entry)
+
+	def play(self, request):
+		"""Returns recorded response to request.
+		"""
+		with self._lock:
+			responses = self._responses.get(key(request.method, request.url, self.ignored_params))
+			if not responses:
+				raise errors.CassetteError('{0}: no recorded response to {1} {2}'.format(self.path, request.method, request.url))
+			entry = (responses.pop() if len(responses) > 1 else responses[0])
+		if self.speed: time.sleep(entry['elapsed'] / self.speed)
+		content = (entry['text'].encode('utf-8') if 'text' in entry else base64.b64decode(entry['base64']))
+		response = requests.Response()
+		response.status_code = entry['status']
+		response.reason = entry['reason']
+		response.headers = CaseInsensitiveDict(entry['headers'])
+		response.headers['Content-Length'] = str(len(content))
+		response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+		response._content = content
+		response._content_consumed = True
+		response.url = request.url
+		response.request = request
+		return response
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+
+"""This module provides helpers for sending many requests at once
+(e.g. fetching comments of all posts on a page of a stream).
+"""
+
+
+from concurrent import futures
+
+
+def concurrently(function, items, workers=8):
+	"""Calls function for each of items using at most `workers`
+	threads at once.
+
+	Errors do not stop other calls, they are captured and returned.
+
+	:param function: callable taking one item as an argument
+	:param items: iterable of hashable objects
+	:param workers: maximal number of simultaneous calls
+	:type workers: int
+	:returns: dict mapping items to exceptions raised for them
+	"""
+	failed = {}
+	with futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+		pending = {executor.submit(function, item): item for item in items}
+		for future in futures.as_completed(pending):
+			error = future.exception()
+			if error is not None: failed[pending[future]] = error
+	return failed
@@ -6,16 +6,45 @@
 """
 
 
+import contextlib
+import contextvars
+import importlib.util
 import json
 import re
 import requests
+import time
 import warnings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from diaspy import errors
+# aiohttp is slow to import, it is imported when AsyncConnection is used
+AIOHTTP_SUPPORT = (importlib.util.find_spec('aiohttp') is not None)
+
+from diaspy import errors, metrics, ratelimit
 
 
 DEBUG = True
 
+# endpoint of the write request on behalf of which requests (e.g. for tokens) are sent
+_cause = contextvars.ContextVar('diaspy_cause', default=None)
+
+
+def makeadapter(pool_connections=10, pool_maxsize=10, max_retries=0, backoff_factor=0):
+	"""Returns HTTP adapter with pool of connections.
+	One adapter can be shared by several Connection objects talking to the same pod.
+
+	:param pool_connections: number of hosts to keep pools for
+	:type pool_connections: int
+	:param pool_maxsize: maximal number of connections kept in the pool of one host
+	:type pool_maxsize: int
+	:param max_retries: how many times failed connections and reads are retried
+	:type max_retries: int
+	:param backoff_factor: retries sleep for {backoff factor} * (2 ** ({retry number} - 1)) seconds
+	:type backoff_factor: float
+	"""
+	retries = Retry(total=max_retries, backoff_factor=backoff_factor, raise_on_status=False)
+	return HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retries)
+
 
 class Connection():
 	"""Object representing connection with the pod.
@@ -26,8 +55,17 @@ class Connection():
 	_token_regex_2 = re.compile(r'content="(.*?)"\s+name="csrf-token')
 	_userinfo_regex_2 = re.compile(r'gon.user=({.*?});gon.')
 	_verify_SSL = True
-
-	def __init__(self, pod, username, password, schema='https'):
+	_post_cache = None
+	# True if request methods are coroutines (see AsyncConnection)
+	asynchronous = False
+	# status codes with which pods reject a stale CSRF token
+	_token_rejected_codes = (422,)
+	# pods also answer 422 to failed validations (e.g. duplicate like), these are not retried
+	_token_error_regex = re.compile(r'authenticity|csrf|change you wanted was rejected', re.IGNORECASE)
+
+	def __init__(self, pod, username, password, schema='https', token_ttl=300,
+				 pool_connections=10, pool_maxsize=10, max_retries=0, backoff_factor=0,
+				 timeout=None, adapter=None, limiter=None, cassette=None):
 		"""
 		:param pod: The complete url of the diaspora pod to use.
 		:type pod: str
@@ -35,12 +73,38 @@ class Connection():
 		:type username: str
 		:param password: The password used to log in.
 		:type password: str
+		:param token_ttl: number of seconds a fetched CSRF token is reused for (None means forever)
+		:type token_ttl: int
+		:param pool_connections: number of hosts to keep pools of connections for
+		:type pool_connections: int
+		:param pool_maxsize: maximal number of connections kept in the pool (set it to the number of threads using connection)
+		:type pool_maxsize: int
+		:param max_retries: how many times failed connections and reads are retried
+		:type max_retries: int
+		:param backoff_factor: retries sleep for {backoff factor} * (2 ** ({retry number} - 1)) seconds
+		:type backoff_factor: float
+		:param timeout: socket timeout in seconds, or (connect, read) tuple, used for all requests
+		:type timeout: float or tuple
+		:param adapter: HTTP adapter shared with other connections (overrides pool and retries params), see makeadapter()
+		:type adapter: requests.adapters.HTTPAdapter
+		:param limiter: rate limiter to use instead of the one shared by all connections to the pod, see diaspy.ratelimit
+		:type limiter: diaspy.ratelimit.RateLimiter
+		:param cassette: cassette to record responses of the pod to, or to replay them from, see diaspy.cassette
+		:type cassette: diaspy.cassette.Cassette
 		"""
 		self.pod = pod
 		self._session = requests.Session()
+		if adapter is None:
+			adapter = makeadapter(pool_connections, pool_maxsize, max_retries, backoff_factor)
+		self._adapter = self._mount(adapter, cassette)
+		self._timeout = timeout
+		self._limiter = limiter
+		self._hooks = {'before': [], 'after': []}
 		self._login_data = {'user[remember_me]': 1, 'utf8': '✓'}
 		self._userdata = {}
 		self._token = ''
+		self._token_ttl = token_ttl
+		self._token_fetched_at = 0
 		self._diaspora_session = ''
 		self._fetch_token_from = 'stream'
 		try: self._setlogin(username, password)
@@ -52,6 +116,18 @@ class Connection():
 				raise errors.LoginError('cannot create login data (caused by: {0})'.format(e))
 		self._cookies = self._fetchcookies()
 
+	def _mount(self, adapter, cassette=None):
+		"""Mounts adapter in session for both schemas.
+
+		:param cassette: cassette the adapter is wrapped in
+		:type cassette: diaspy.cassette.Cassette
+		:returns: mounted adapter
+		"""
+		if cassette is not None: adapter = cassette.adapter(adapter)
+		self._session.mount('https://', adapter)
+		self._session.mount('http://', adapter)
+		return adapter
+
 	def _fetchcookies(self):
 		request = self.get('stream')
 		return request.cookies
@@ -61,8 +137,10 @@ class Connection():
 		It will be easier to change backend if programs will just use:
 			repr(connection)
 		instead of calling a specified method.
+
+		Cached token is returned if it is still valid.
 		"""
-		return self._fetchtoken()
+		return self.get_token(fetch=False)
 
 	def get(self, string, headers={}, params={}, direct=False, **kwargs):
 		"""This method gets data from session.
@@ -78,7 +156,7 @@ class Connection():
 		"""
 		if not direct: url = '{0}/{1}'.format(self.pod, string)
 		else: url = string
-		return self._session.get(url, params=params, headers=headers, verify=self._verify_SSL, **kwargs)
+		return self._request('get', url, params=params, headers=headers, **kwargs)
 
 	def tokenFrom(self, location):
 		"""Sets location for the *next* fetch of CSRF token.
@@ -107,21 +185,13 @@ class Connection():
 		:param params: Parameters (optional).
 		:type params: dict
 		"""
-		string = '{0}/{1}'.format(self.pod, string)
-		if 'X-CSRF-Token' not in headers:
-			headers['X-CSRF-Token'] = self.get_token()
-		request = self._session.post(string, data, headers=headers, params=params, verify=self._verify_SSL, **kwargs)
-		return request
+		return self._write('post', string, data=data, headers=headers, params=params, **kwargs)
 
 	def put(self, string, data=None, headers={}, params={}, **kwargs):
 		"""This method PUTs to session.
 		"""
-		string = '{0}/{1}'.format(self.pod, string)
-		if 'X-CSRF-Token' not in headers:
-			headers['X-CSRF-Token'] = self.get_token()
-		if data is not None: request = self._session.put(string, data, headers=headers, params=params, **kwargs)
-		else: request = self._session.put(string, headers=headers, params=params, verify=self._verify_SSL, **kwargs)
-		return request
+		if data is not None: kwargs['data'] = data
+		return self._write('put', string, headers=headers, params=params, **kwargs)
 
 	def delete(self, string, data = None, headers={}, **kwargs):
 		"""This method lets you send delete request to session.
@@ -133,12 +203,155 @@ class Connection():
 		:param headers: Headers to use (optional).
 		:type headers: dict
 		"""
-		string = '{0}/{1}'.format(self.pod, string)
-		if 'X-CSRF-Token' not in headers:
-			headers['X-CSRF-Token'] = self.get_token()
-		request = self._session.delete(string, data=data, headers=headers, verify=self._verify_SSL, **kwargs)
+		return self._write('delete', string, data=data, headers=headers, **kwargs)
+
+	def _write(self, method, string, headers={}, **kwargs):
+		"""Sends a request that has to carry CSRF token.
+
+		Token is taken from cache (see get_token()).
+		If the pod rejects it the cache is invalidated, fresh token is
+		fetched and the request is retried once. Token fetched for
+		this very request is not refetched.
+		"""
+		url = '{0}/{1}'.format(self.pod, string)
+		headers = dict(headers)
+		fetched_at = self._token_fetched_at
+		with self._onbehalf(method, url):
+			if not self._tokenheader(headers):
+				headers['X-CSRF-Token'] = self.get_token(fetch=False)
+		stale = self._token
+		request = self._request(method, url, headers=headers, **kwargs)
+		if self._token_fetched_at == fetched_at and self._rejected(request):
+			self._invalidatetoken()
+			with self._onbehalf(method, url):
+				token = self.get_token()
+			self._retoken(headers, kwargs.get('data'), stale, token)
+			request = self._request(method, url, headers=headers, **kwargs)
 		return request
 
+	def _request(self, method, url, **kwargs):
+		"""Sends request using the session.
+
+		Request waits for the rate limiter of the pod and is retried
+		if pod asks to slow down (429 or 503 status code).
+		"""
+		kwargs.setdefault('verify', self._verify_SSL)
+		kwargs.setdefault('timeout', self._timeout)
+		limiter = self.getLimiter()
+		attempt = 0
+		while True:
+			limiter.acquire()
+			event = self._before(method, url, kwargs)
+			try:
+				request = self._session.request(method, url, **kwargs)
+			except Exception:
+				self._after(event, None)
+				raise
+			self._after(event, request, kwargs.get('stream', False))
+			delay = limiter.delay(request, attempt)
+			if delay is None:
+				# other requests to the pod must back off even if this one gives up
+				limiter.hold(request)
+				return request
+			request.close()
+			limiter.block(delay)
+			self._rewind(kwargs.get('data'))
+			attempt += 1
+
+	@contextlib.contextmanager
+	def _onbehalf(self, method, url):
+		"""Attributes requests sent inside the block (e.g. for CSRF token)
+		to the write request they are sent for.
+		"""
+		cause = _cause.set('{0} {1}'.format(method.upper(), metrics.endpoint(url, self.pod)))
+		try:
+			yield
+		finally:
+			_cause.reset(cause)
+
+	def addHook(self, when, hook):
+		"""Adds function called before ('before') or after ('after')
+		every request sent by this connection (retries included).
+
+		Hooks get one argument: dict describing the request, with keys
+		`method`, `url`, `endpoint` (normalised, see diaspy.metrics),
+		`cause` (endpoint of the write on behalf of which the request is
+		sent, e.g. to fetch CSRF token, or None) and `bytes_out`.
+		After the request there are also `status` (None if request failed),
+		`elapsed` (seconds) and `bytes_in`.
+
+		:param when: 'before' or 'after'
+		:type when: str
+		"""
+		self._hooks[when].append(hook)
+
+	def removeHook(self, when, hook):
+		"""Removes hook added with addHook().
+		"""
+		self._hooks[when].remove(hook)
+
+	def _before(self, method, url, kwargs):
+		"""Calls hooks before request and returns dict describing it,
+		or None if there are no hooks.
+		"""
+		if not (self._hooks['before'] or self._hooks['after']): return None
+		event = {'method': method.upper(),
+				 'url': url,
+				 'endpoint': metrics.endpoint(url, self.pod),
+				 'cause': _cause.get(),
+				 'bytes_out': metrics.bodysize(kwargs.get('data')),
+				 'started': time.perf_counter()}
+		for hook in self._hooks['before']: hook(event)
+		return event
+
+	def _after(self, event, response, stream=False):
+		"""Calls hooks after request.
+		"""
+		if event is None: return
+		event['elapsed'] = time.perf_counter() - event['started']
+		event['status'] = (response.status_code if response is not None else None)
+		event['bytes_in'] = 0
+		if response is not None:
+			# content of streamed response must not be read here
+			if stream: event['bytes_in'] = int(response.headers.get('content-length', 0))
+			else: event['bytes_in'] = len(response.content)
+		for hook in self._hooks['after']: hook(event)
+
+	def _rewind(self, data):
+		"""Rewinds file sent as data of request, so it can be sent again.
+		"""
+		if hasattr(data, 'seek'): data.seek(0)
+
+	def _tokenheader(self, headers):
+		"""Returns name of the CSRF header present in headers or None.
+		"""
+		for key in headers:
+			if key.lower() == 'x-csrf-token': return key
+		return None
+
+	def _rejected(self, request):
+		"""Returns True if pod rejected request because of invalid CSRF token.
+
+		Pods answer such requests with 422 or redirect them to the sign in
+		page (redirect may have been followed already, see `history`).
+		"""
+		if request.status_code in self._token_rejected_codes:
+			return self._token_error_regex.search(request.text) is not None
+		responses = list(request.history) + [request]
+		# failed login attempt is also redirected to the sign in page
+		if responses[0].url.endswith('users/sign_in'): return False
+		for response in responses:
+			if response.is_redirect and 'users/sign_in' in response.headers.get('location', ''): return True
+		return False
+
+	def _retoken(self, headers, data, stale, token):
+		"""Replaces stale token in headers and data with a fresh one.
+		"""
+		headers[self._tokenheader(headers)] = token
+		self._rewind(data)
+		if isinstance(data, dict) and data.get('authenticity_token') == stale:
+			data['authenticity_token'] = token
+
 	def _setlogin(self, username, password):
 		"""This function is used to set data for login.
 
@@ -168,6 +381,8 @@ class Connection():
 		self._login_data['user[remember_me]'] = remember_me
 		status = self._login()
 		self._login_data = {}
+		# pods issue new token for authenticated session
+		self._invalidatetoken()
 		return self
 
 	def logout(self):
@@ -175,12 +390,13 @@ class Connection():
 		When logged out you can't do anything.
 		"""
 		self.get('users/sign_out')
-		self.token = ''
+		self._invalidatetoken()
 
 	def podswitch(self, pod, username, password, login=True):
 		"""Switches pod from current to another one.
 		"""
 		self.pod = pod
+		self._invalidatetoken()
 		self._setlogin(username, password)
 		if login: self._login()
 
@@ -190,19 +406,42 @@ class Connection():
 		:returns: token string
 		"""
 		request = self.get(self._fetch_token_from)
-		token = self._token_regex.search(request.text)
-		if token is None: token = self._token_regex_2.search(request.text)
+		return self._settoken(request.text)
+
+	def _settoken(self, text):
+		"""Extracts token from HTML and stores it.
+
+		:returns: token string
+		"""
+		token = self._token_regex.search(text)
+		if token is None: token = self._token_regex_2.search(text)
 		if token is not None: token = token.group(1)
 		else: raise errors.TokenError('could not find valid CSRF token')
 		self._token = token
+		self._token_fetched_at = time.monotonic()
 		self._fetch_token_from = 'stream'
 		return token
 
+	def _invalidatetoken(self):
+		"""Drops cached token so the next call to get_token() will fetch new one.
+		"""
+		self._token = ''
+		self._token_fetched_at = 0
+
+	def _tokenexpired(self):
+		"""Returns True if cached token is missing or older than token TTL.
+		"""
+		if not self._token: return True
+		if self._token_ttl is None: return False
+		return (time.monotonic() - self._token_fetched_at) >= self._token_ttl
+
 	def get_token(self, fetch=True):
 		"""This function returns a token needed for authentication in most cases.
 		**Notice:** using repr() is recommended method for getting token.
 
-		Each time it is run a _fetchtoken() is called and refreshed token is stored.
+		When `fetch` is True a _fetchtoken() is called and refreshed token is stored.
+		Otherwise cached token is reused until it expires (see `token_ttl` parameter
+		of the constructor) or location for the next token was set with tokenFrom().
 
 		It is more safe to use than _fetchtoken().
 		By setting new you can request new token or decide to get stored one.
@@ -210,8 +449,9 @@ class Connection():
 
 		:returns: string -- token used to authenticate
 		"""
+		if self._fetch_token_from != 'stream': fetch = True
 		try:
-			if fetch or not self._token: self._fetchtoken()
+			if fetch or self._tokenexpired(): self._fetchtoken()
 		except requests.exceptions.ConnectionError as e:
 			warnings.warn('{0} was cought: reusing old token'.format(e))
 		finally:
@@ -226,12 +466,21 @@ class Connection():
 	def userdata(self):
 		return self._userdata
 
-	def getUserData(self):
+	def getUserData(self, cached=False):
 		"""Returns user data.
+
+		:param cached: return data fetched before (if any) instead of fetching it again
+		:type cached: bool
 		"""
+		if cached and self._userdata: return self._userdata
 		request = self.get('bookmarklet')
-		userdata = self._userinfo_regex.search(request.text)
-		if userdata is None: userdata = self._userinfo_regex_2.search(request.text)
+		return self._setuserdata(request.text)
+
+	def _setuserdata(self, text):
+		"""Extracts user data from HTML and stores it.
+		"""
+		userdata = self._userinfo_regex.search(text)
+		if userdata is None: userdata = self._userinfo_regex_2.search(text)
 		if userdata is None: raise errors.DiaspyError('cannot find user data')
 		userdata = userdata.group(1)
 		self._userdata = json.loads(userdata)
@@ -241,3 +490,282 @@ class Connection():
 		"""Sets whether there should be an error if a SSL-Certificate could not be verified.
 		"""
 		self._verify_SSL = verify
+
+	def getLimiter(self):
+		"""Returns rate limiter used by this connection.
+		"""
+		if self._limiter is not None: return self._limiter
+		return ratelimit.forpod(self.pod)
+
+	def getAdapter(self):
+		"""Returns HTTP adapter (with its pool of connections) used by this connection.
+		It can be passed to other Connection objects talking to the same pod:
+
+			other = Connection(pod, username, password, adapter=connection.getAdapter())
+		"""
+		return self._adapter
+
+	def set_post_cache(self, cache):
+		"""Sets cache of posts used by posts and streams obtained with this connection.
+
+		:param cache: cache or None to disable caching
+		:type cache: diaspy.cache.PostCache
+		"""
+		self._post_cache = cache
+
+	def get_post_cache(self):
+		"""Returns cache of posts or None if caching is disabled.
+		"""
+		return self._post_cache
+
+
+class AsyncResponse():
+	"""Response received by AsyncConnection.
+
+	Body is read before the object is created so it mimics the parts of
+	requests.Response used by diaspy (`status_code`, `text`, `json()`, etc.).
+	"""
+	def __init__(self, response, content):
+		self.status_code = response.status
+		self.headers = response.headers
+		self.cookies = response.cookies
+		self.url = str(response.url)
+		self.encoding = response.charset or 'utf-8'
+		self.content = content
+		# redirects followed before this response (their bodies are not read)
+		self.history = [AsyncResponse(redirect, b'') for redirect in getattr(response, 'history', ())]
+
+	def __bool__(self):
+		return self.status_code < 400
+
+	@property
+	def is_redirect(self):
+		return self.status_code in (301, 302, 303, 307, 308) and 'location' in self.headers
+
+	@property
+	def text(self):
+		return self.content.decode(self.encoding, 'replace')
+
+	def json(self):
+		return json.loads(self.text)
+
+
+class AsyncConnection(Connection):
+	"""Connection with the pod driven by asyncio event loop.
+
+	It has the same get()/post()/put()/delete()/tokenFrom() interface
+	as Connection but request methods are coroutines.
+	Nothing is sent to pod before login() is awaited:
+
+		connection = AsyncConnection(pod, username, password)
+		await connection.login()
+		stream = diaspy.streams.Stream(connection, fetch=False)
+		await stream.afill()
+		await connection.close()
+
+	.. note::
+		repr() cannot fetch token here -- it returns cached token.
+		Use `await connection.get_token()` instead.
+
+	Requires aiohttp.
+	"""
+	asynchronous = True
+
+	def __init__(self, pod, username, password, schema='https', token_ttl=300, limiter=None):
+		"""
+		:param pod: The complete url of the diaspora pod to use.
+		:type pod: str
+		:param username: The username used to log in.
+		:type username: str
+		:param password: The password used to log in.
+		:type password: str
+		:param token_ttl: number of seconds a fetched CSRF token is reused for (None means forever)
+		:type token_ttl: int
+		:param limiter: rate limiter to use instead of the one shared by all connections to the pod, see diaspy.ratelimit
+		:type limiter: diaspy.ratelimit.RateLimiter
+		"""
+		if not AIOHTTP_SUPPORT:
+			raise errors.DiaspyError('aiohttp is required to use AsyncConnection')
+		if '://' not in pod:
+			pod = '{0}://{1}'.format(schema, pod)
+			warnings.warn('schema was missing')
+		self.pod = pod
+		self._session = None
+		self._limiter = limiter
+		self._hooks = {'before': [], 'after': []}
+		self._login_data = {'user[username]': username,
+							'user[password]': password,
+							'user[remember_me]': 1,
+							'utf8': '✓'}
+		self._userdata = {}
+		self._token = ''
+		self._token_ttl = token_ttl
+		self._token_fetched_at = 0
+		self._diaspora_session = ''
+		self._fetch_token_from = 'stream'
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, *exc):
+		await self.close()
+
+	def __repr__(self):
+		"""Returns cached token string.
+		"""
+		return self._token
+
+	def _getsession(self):
+		"""Returns aiohttp session, creating it on first use
+		(it must be created inside running event loop).
+		"""
+		import aiohttp
+		if self._session is None:
+			self._session = aiohttp.ClientSession()
+		return self._session
+
+	async def close(self):
+		"""Closes underlying HTTP session.
+		"""
+		if self._session is not None:
+			await self._session.close()
+			self._session = None
+
+	async def get(self, string, headers={}, params={}, direct=False, **kwargs):
+		"""Coroutine getting data from session.
+		See Connection.get().
+		"""
+		if not direct: url = '{0}/{1}'.format(self.pod, string)
+		else: url = string
+		return await self._request('get', url, params=params, headers=headers, **kwargs)
+
+	async def post(self, string, data, headers={}, params={}, **kwargs):
+		"""Coroutine posting data to session.
+		See Connection.post().
+		"""
+		return await self._write('post', string, data=data, headers=headers, params=params, **kwargs)
+
+	async def put(self, string, data=None, headers={}, params={}, **kwargs):
+		"""Coroutine PUTting to session.
+		"""
+		if data is not None: kwargs['data'] = data
+		return await self._write('put', string, headers=headers, params=params, **kwargs)
+
+	async def delete(self, string, data=None, headers={}, **kwargs):
+		"""Coroutine sending delete request to session.
+		"""
+		return await self._write('delete', string, data=data, headers=headers, **kwargs)
+
+	async def _write(self, method, string, headers={}, **kwargs):
+		"""Sends a request that has to carry CSRF token.
+		See Connection._write().
+		"""
+		url = '{0}/{1}'.format(self.pod, string)
+		headers = dict(headers)
+		fetched_at = self._token_fetched_at
+		with self._onbehalf(method, url):
+			if not self._tokenheader(headers):
+				headers['X-CSRF-Token'] = await self.get_token(fetch=False)
+		stale = self._token
+		request = await self._request(method, url, headers=headers, **kwargs)
+		if self._token_fetched_at == fetched_at and self._rejected(request):
+			self._invalidatetoken()
+			with self._onbehalf(method, url):
+				token = await self.get_token()
+			self._retoken(headers, kwargs.get('data'), stale, token)
+			request = await self._request(method, url, headers=headers, **kwargs)
+		return request
+
+	async def _request(self, method, url, **kwargs):
+		"""Sends request using aiohttp session and reads the response.
+		"""
+		import asyncio
+		if not kwargs.pop('verify', self._verify_SSL): kwargs['ssl'] = False
+		limiter = self.getLimiter()
+		attempt = 0
+		while True:
+			delay = limiter.reserve()
+			if delay: await asyncio.sleep(delay)
+			request = await self._send(method, url, kwargs)
+			delay = limiter.delay(request, attempt)
+			if delay is None:
+				limiter.hold(request)
+				return request
+			limiter.block(delay)
+			self._rewind(kwargs.get('data'))
+			attempt += 1
+
+	async def _send(self, method, url, kwargs):
+		"""Sends single request and reads the response, calling request hooks.
+		"""
+		event = self._before(method, url, kwargs)
+		try:
+			async with self._getsession().request(method, url, **kwargs) as response:
+				content = await response.read()
+				request = AsyncResponse(response, content)
+		except Exception:
+			self._after(event, None)
+			raise
+		self._after(event, request)
+		return request
+
+	async def _fetchtoken(self):
+		"""Coroutine getting token string needed for authentication on D*.
+		"""
+		request = await self.get(self._fetch_token_from)
+		return self._settoken(request.text)
+
+	async def get_token(self, fetch=True):
+		"""Coroutine returning a token needed for authentication.
+		See Connection.get_token().
+		"""
+		import aiohttp
+		if self._fetch_token_from != 'stream': fetch = True
+		try:
+			if fetch or self._tokenexpired(): await self._fetchtoken()
+		except aiohttp.ClientConnectionError as e:
+			warnings.warn('{0} was cought: reusing old token'.format(e))
+		finally:
+			if not self._token: raise errors.TokenError('cannot obtain token and no previous token found for reuse')
+		return self._token
+
+	async def login(self, remember_me=1):
+		"""Coroutine logging in to a pod.
+		Will raise LoginError if password or username was not specified.
+		"""
+		if not self._login_data['user[username]'] or not self._login_data['user[password]']:
+			raise errors.LoginError('username and/or password is not specified')
+		self._login_data['user[remember_me]'] = remember_me
+		self._login_data['authenticity_token'] = await self.get_token()
+		request = await self.post('users/sign_in',
+								data=self._login_data,
+								allow_redirects=False)
+		if request.status_code != 302:
+			raise errors.LoginError('{0}: login failed'.format(request.status_code))
+		self._login_data = {}
+		self._invalidatetoken()
+		return self
+
+	async def logout(self):
+		"""Coroutine logging out from a pod.
+		"""
+		await self.get('users/sign_out')
+		self._invalidatetoken()
+
+	async def podswitch(self, pod, username, password, login=True):
+		"""Switches pod from current to another one.
+		"""
+		self.pod = pod
+		self._invalidatetoken()
+		self._login_data = {'user[username]': username,
+							'user[password]': password,
+							'user[remember_me]': 1,
+							'utf8': '✓'}
+		if login: await self.login()
+
+	async def getUserData(self, cached=False):
+		"""Coroutine returning user data.
+		"""
+		if cached and self._userdata: return self._userdata
+		request = await self.get('bookmarklet')
+		return self._setuserdata(request.text)
@@ -1,11 +1,18 @@
 #!/usr/bin/env python3
 
 
+import asyncio
+
 from diaspy import errors, models
+from diaspy.concurrency import concurrently
 
 
 class Mailbox():
 	"""Object implementing diaspora* mailbox.
+
+	Conversations are created from the list sent by pod, without
+	fetching each of them. Missing data is fetched on demand or for many
+	conversations at once with hydrate().
 	"""
 	def __init__(self, connection, fetch=True):
 		self._connection = connection
@@ -21,12 +28,79 @@ class Mailbox():
 	def __getitem__(self, n):
 		return self._mailbox[n]
 
-	def _fetch(self):
+	def _fetch(self, page=1):
 		"""This method will fetch messages from user's mailbox.
+
+		:param page: page of the mailbox to fetch
+		:type page: int
+		"""
+		self._mailbox = self._page(page)
+
+	def _page(self, page=1):
+		"""Returns list of conversations from given page of the mailbox.
 		"""
-		request = self._connection.get('conversations.json')
+		request = self._connection.get('conversations.json', params=self._params(page))
+		return self._finalise(request)
 
+	def _params(self, page):
+		if page > 1: return {'page': page}
+		return {}
+
+	def _finalise(self, request):
+		"""Creates conversations from the list sent by pod.
+		"""
 		if request.status_code != 200:
 			raise errors.DiaspyError('wrong status code: {0}'.format(request.status_code))
-		mailbox = request.json()
-		self._mailbox = [models.Conversation(self._connection, c['conversation']['id']) for c in mailbox]
+		return [models.Conversation(self._connection, c['conversation']['id'], fetch=False, data=c['conversation'])
+				for c in request.json()]
+
+	def iter_conversations(self, page=1):
+		"""Yields conversations from all pages of the mailbox, starting
+		at given page. Pages are fetched as they are needed.
+
+		:param page: page of the mailbox to start at
+		:type page: int
+		"""
+		previous = set()
+		while True:
+			conversations = self._page(page)
+			ids = set(c.id for c in conversations)
+			# stop on empty page, or when pod does not paginate and repeats it
+			if not conversations or ids <= previous: break
+			for conversation in conversations: yield conversation
+			previous = ids
+			page += 1
+
+	def hydrate(self, conversations=None, workers=8):
+		"""Fetches full data of conversations concurrently.
+
+		:param conversations: conversations to fetch (defaults to the ones in the mailbox)
+		:type conversations: list of diaspy.models.Conversation
+		:param workers: maximal number of simultaneous requests
+		:type workers: int
+		:returns: dict mapping conversations to errors raised while fetching them
+		"""
+		if conversations is None: conversations = self._mailbox
+		return concurrently(lambda conversation: conversation._fetch(), conversations, workers)
+
+	async def afetch(self, page=1, hydrate=True):
+		"""Coroutine version of _fetch() for mailboxes using
+		diaspy.connection.AsyncConnection (create them with `fetch=False`).
+
+		Data of conversations cannot be fetched on demand with
+		AsyncConnection so it is fetched here, unless `hydrate` is False
+		(then await ahydrate() before using conversations).
+
+		:param hydrate: whether to fetch full data of the conversations
+		:type hydrate: bool
+		"""
+		request = await self._connection.get('conversations.json', params=self._params(page))
+		self._mailbox = self._finalise(request)
+		if hydrate: await self.ahydrate()
+
+	async def ahydrate(self, conversations=None):
+		"""Coroutine version of hydrate() for mailboxes using
+		diaspy.connection.AsyncConnection.
+		"""
+		if conversations is None: conversations = self._mailbox
+		await asyncio.gather(*[conversation._afetch() for conversation in conversations])
@@ -115,6 +115,12 @@ class TagError(DiaspyError):
 	"""
 	pass
 
+
+class CassetteError(DiaspyError):
+	"""Exception raised when responses cannot be recorded or replayed.
+	"""
+	pass
+
 def react(r, message='', accepted=[200, 201, 202, 203, 204, 205, 206], exception=DiaspyError):
 	"""This method tries to decide how to react
 	to a response code passed to it. If it's an
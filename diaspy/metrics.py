@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+"""This module provides metrics of requests sent by connections.
+
+Connections call hooks before and after every request they send (see
+Connection.addHook()). Collector is a hook gathering per-endpoint
+counters which can be exported as text or in Prometheus format:
+
+	collector = diaspy.metrics.Collector()
+	collector.attach(connection)
+	...
+	print(collector.text())
+
+Endpoints are normalised, e.g. every `posts/123/comments.json` is
+counted as `posts/{id}/comments.json`. Requests for CSRF tokens are
+attributed to the write that caused them (`cause` of the request).
+"""
+
+
+import re
+import threading
+import urllib.parse
+
+import requests
+
+
+# upper bounds (in seconds) of buckets of latency histogram
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf'))
+
+_number_regex = re.compile(r'^\d+$')
+_guid_regex = re.compile(r'^(?:[0-9a-fA-F]{16,}|'
+						 r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})$')
+# segments following these ones are names, not part of the endpoint
+_named = {'tags': '{tag}', 'u': '{username}'}
+
+
+def endpoint(url, pod=''):
+	"""Returns normalised endpoint of URL: path without pod and query,
+	with ids, GUIDs and names replaced by placeholders.
+
+	>>> endpoint('https://pod.example.com/posts/123/comments.json?page=2', 'https://pod.example.com')
+	'posts/{id}/comments.json'
+	"""
+	if pod and url.startswith(pod): url = url[len(pod):]
+	path = urllib.parse.urlsplit(url).path.strip('/')
+	segments = path.split('/')
+	for i, segment in enumerate(segments):
+		name, dot, ext = segment.partition('.')
+		if i and segments[i-1] in _named: name = _named[segments[i-1]]
+		elif _number_regex.match(name): name = '{id}'
+		elif _guid_regex.match(name): name = '{guid}'
+		segments[i] = name + dot + ext
+	return '/'.join(segments)
+
+
+def bodysize(data):
+	"""Returns size of request body (in bytes) made from given data.
+	"""
+	if data is None: return 0
+	if isinstance(data, dict): data = urllib.parse.urlencode(data)
+	if isinstance(data, str): data = data.encode('utf-8')
+	try:
+		return requests.utils.super_len(data)
+	except Exception:
+		return 0
+
+
+def _labels(key, **extra):
+	"""Returns Prometheus labels of endpoint identified by key.
+	"""
+	pairs = list(zip(('method', 'endpoint', 'cause'), key)) + sorted(extra.items())
+	values = (str(value).replace('\\', '\\\\').replace('"', '\\"') for name, value in pairs)
+	return ','.join('{0}="{1}"'.format(name, value) for (name, _), value in zip(pairs, values))
+
+
+def _histogram(name, key, metric):
+	"""Returns lines of Prometheus latency histogram of endpoint identified by key.
+	"""
+	lines = []
+	cumulative = 0
+	for bound, n in zip(BUCKETS, metric['buckets']):
+		cumulative += n
+		le = ('+Inf' if bound == float('inf') else repr(bound))
+		lines.append('{0}_bucket{{{1}}} {2}'.format(name, _labels(key, le=le), cumulative))
+	lines.append('{0}_sum{{{1}}} {2}'.format(name, _labels(key), metric['seconds']))
+	lines.append('{0}_count{{{1}}} {2}'.format(name, _labels(key), metric['count']))
+	return lines
+
+
+class Collector():
+	"""In-memory collector of per-endpoint metrics: number of requests,
+	status codes, latency histogram and bytes sent and received.
+
+	Can be attached to many connections and shared between threads.
+	"""
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._metrics = {}
+
+	def attach(self, connection):
+		"""Starts collecting metrics of requests sent by given connection.
+		"""
+		connection.addHook('after', self.after)
+		return self
+
+	def detach(self, connection):
+		"""Stops collecting metrics of requests sent by given connection.
+		"""
+		connection.removeHook('after', self.after)
+
+	def clear(self):
+		"""Drops collected metrics.
+		"""
+		with self._lock:
+			self._metrics = {}
+
+	def after(self, event):
+		"""Hook recording finished request.
+		"""
+		key = (event['method'], event['endpoint'], event['cause'] or '')
+		with self._lock:
+			metric = self._metrics.get(key)
+			if metric is None:
+				metric = self._metrics[key] = {'count': 0, 'statuses': {}, 'buckets': [0] * len(BUCKETS),
+												'seconds': 0.0, 'bytes_in': 0, 'bytes_out': 0}
+			metric['count'] += 1
+			status = event['status']
+			if status is None: status = 'error'
+			metric['statuses'][status] = metric['statuses'].get(status, 0) + 1
+			for i, bound in enumerate(BUCKETS):
+				if event['elapsed'] <= bound:
+					metric['buckets'][i] += 1
+					break
+			metric['seconds'] += event['elapsed']
+			metric['bytes_in'] += event['bytes_in']
+			metric['bytes_out'] += event['bytes_out']
+
+	def metrics(self):
+		"""Returns copy of collected metrics: dict mapping
+		(method, endpoint, cause) tuples to dicts with keys `count`,
+		`statuses`, `buckets` (counts of requests in latency buckets,
+		see BUCKETS), `seconds`, `bytes_in` and `bytes_out`.
+		"""
+		with self._lock:
+			return {key: dict(metric, statuses=dict(metric['statuses']), buckets=list(metric['buckets']))
+					for key, metric in self._metrics.items()}
+
+	def text(self):
+		"""Returns collected metrics as human readable table, slowest
+		endpoints (by total time) first.
+		"""
+		metrics = sorted(self.metrics().items(), key=lambda item: -item[1]['seconds'])
+		lines = ['{0:<7} {1:<40} {2:>7} {3:>10} {4:>10} {5:>11} {6:>11}  {7}'.format(
+				 'method', 'endpoint', 'count', 'total [s]', 'mean [ms]', 'bytes in', 'bytes out', 'statuses')]
+		for (method, endpoint, cause), metric in metrics:
+			if cause: endpoint = '{0} (for {1})'.format(endpoint, cause)
+			statuses = ', '.join('{0}: {1}'.format(status, n) for status, n in sorted(metric['statuses'].items(), key=str))
+			lines.append('{0:<7} {1:<40} {2:>7} {3:>10.3f} {4:>10.1f} {5:>11} {6:>11}  {7}'.format(
+						 method, endpoint, metric['count'], metric['seconds'], 1000 * metric['seconds'] / metric['count'],
+						 metric['bytes_in'], metric['bytes_out'], statuses))
+		return '\n'.join(lines) + '\n'
+
+	def prometheus(self, prefix='diaspy'):
+		"""Returns collected metrics in Prometheus text exposition format.
+		"""
+		metrics = sorted(self.metrics().items())
+		lines = []
+		lines.append('# HELP {0}_requests_total Requests sent to pod.'.format(prefix))
+		lines.append('# TYPE {0}_requests_total counter'.format(prefix))
+		for key, metric in metrics:
+			for status, n in sorted(metric['statuses'].items(), key=str):
+				lines.append('{0}_requests_total{{{1}}} {2}'.format(prefix, _labels(key, status=status), n))
+		lines.append('# HELP {0}_request_duration_seconds Latency of requests.'.format(prefix))
+		lines.append('# TYPE {0}_request_duration_seconds histogram'.format(prefix))
+		for key, metric in metrics: lines.extend(_histogram('{0}_request_duration_seconds'.format(prefix), key, metric))
+		for direction, verb in (('in', 'received'), ('out', 'sent')):
+			name = '{0}_{1}_bytes_total'.format(prefix, verb)
+			lines.append('# HELP {0} Bytes {1} by requests.'.format(name, verb))
+			lines.append('# TYPE {0} counter'.format(name))
+			for key, metric in metrics:
+				lines.append('{0}{{{1}}} {2}'.format(name, _labels(key), metric['bytes_' + direction]))
+		return '\n'.join(lines) + '\n'
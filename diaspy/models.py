@@ -2,23 +2,29 @@
 
 
 """This module is only imported in other diaspy modules and
-MUST NOT import anything.
+MUST NOT import other diaspy modules (except diaspy.errors).
+Slow third-party modules (e.g. bs4) are imported on first use.
 """
 
 
 import json
 import copy
+import importlib.util
 import re
 
-BS4_SUPPORT=False
-try:
-	from bs4 import BeautifulSoup
-except ImportError:
-	print("[diaspy] BeautifulSoup not found, falling back on regex.")
-else: BS4_SUPPORT=True
+# bs4 is slow to import, it is imported on first use (see parsehtml())
+BS4_SUPPORT = (importlib.util.find_spec('bs4') is not None)
 
 from diaspy import errors
 
+
+def parsehtml(markup):
+	"""Returns BeautifulSoup of HTML markup.
+	"""
+	from bs4 import BeautifulSoup
+	return BeautifulSoup(markup, 'lxml')
+
+
 class Aspect():
 	"""This class represents an aspect.
 
@@ -134,7 +140,10 @@ class Aspect():
 
 class Notification():
 	"""This class represents single notification.
+
+	Note HTML is parsed once, on first call to str(), about() or who().
 	"""
+	__slots__ = ('_connection', 'type', '_data', 'id', 'unread', '_parsed')
 	_who_regexp = re.compile(r'/people/([0-9a-f]+)["\']{1} class=["\']{1}hovercardable')
 	_aboutid_regexp = re.compile(r'/posts/[0-9a-f]+')
 	_htmltag_regexp = re.compile('</?[a-z]+( *[a-z_-]+=["\'].*?["\'])* */?>')
@@ -145,6 +154,61 @@ class Notification():
 		self._data = data[self.type]
 		self.id = self._data['id']
 		self.unread = self._data['unread']
+		self._parsed = None
+
+	@classmethod
+	def parseall(cls, notifications):
+		"""Parses notes of many notifications (e.g. a page of them).
+
+		Every note is parsed as a separate fragment: notes are sent by the
+		pod and their HTML is not guaranteed to be balanced, so an unclosed
+		tag of one note must not swallow the following ones.
+
+		:param notifications: list of Notification() objects
+		:type notifications: list
+		"""
+		for notification in notifications: notification._parse()
+
+	def _parse(self):
+		"""Returns dict with text, list of actors' guids and target
+		of the notification, parsing note HTML if it was not parsed yet.
+		"""
+		if self._parsed is not None: return self._parsed
+		if BS4_SUPPORT:
+			self._parsed = self._parsesoup(parsehtml(self._data['note_html']))
+		else:
+			html = self._data['note_html']
+			text = re.sub(self._htmltag_regexp, '', html)
+			text = text.strip().split('\n')[0]
+			while '  ' in text: text = text.replace('  ', ' ')
+			who = list(set([who for who in self._who_regexp.findall(html)]))
+			self._parsed = {'text': text, 'who': who, 'about': self._aboutfromhtml(who)}
+		return self._parsed
+
+	def _parsesoup(self, soup):
+		"""Extracts text, actors and target of the notification from parsed note.
+		"""
+		hovercardable_soup = soup.findAll('a', {"class": "hovercardable"})
+		who = list(set([a['href'][8:] for a in hovercardable_soup]))
+		about = soup.find('a', {"data-ref": True})
+		if about: about = about['data-ref']
+		else: about = self._aboutfromhtml(who)
+		media_body = soup.find('div', {"class": "media-body"})
+		if media_body is None: media_body = soup
+		div = media_body.find('div')
+		if div: div.decompose()
+		return {'text': media_body.getText().strip(), 'who': who, 'about': about}
+
+	def _aboutfromhtml(self, who):
+		"""Finds id of post in note HTML, falls back on the first actor
+		(or None if there is none).
+		"""
+		about = self._aboutid_regexp.search(self._data['note_html'])
+		if about is not None:
+			about = about.group(0)[7:]
+			if about.isdigit(): about = int(about)
+		elif who: about = who[0]
+		return about
 
 	def __getitem__(self, key):
 		"""Returns a key from notification data.
@@ -154,17 +218,7 @@ class Notification():
 	def __str__(self):
 		"""Returns notification note.
 		"""
-		if BS4_SUPPORT:
-			soup = BeautifulSoup(self._data['note_html'], 'lxml')
-			media_body = soup.find('div', {"class": "media-body"})
-			div = media_body.find('div')
-			if div: div.decompose()
-			return media_body.getText().strip()
-		else:
-			string = re.sub(self._htmltag_regexp, '', self._data['note_html'])
-			string = string.strip().split('\n')[0]
-			while '  ' in string: string = string.replace('  ', ' ')
-			return string
+		return self._parse()['text']
 
 	def __repr__(self):
 		"""Returns notification note with more details.
@@ -175,24 +229,12 @@ class Notification():
 		"""Returns id of post about which the notification is informing OR:
 		If the id is None it means that it's about user so .who() is called.
 		"""
-		if BS4_SUPPORT:
-			soup = BeautifulSoup(self._data['note_html'], 'lxml')
-			id = soup.find('a', {"data-ref": True})
-			if id: return id['data-ref']
-		about = self._aboutid_regexp.search(self._data['note_html'])
-		if about is None: about = self.who()[0]
-		else: about = int(about.group(0)[7:])
-		return about
+		return self._parse()['about']
 
 	def who(self):
 		"""Returns list of guids of the users who caused you to get the notification.
 		"""
-		if BS4_SUPPORT: # Parse the HTML with BS4
-			soup = BeautifulSoup(self._data['note_html'], 'lxml')
-			hovercardable_soup = soup.findAll('a', {"class": "hovercardable"})
-			return list(set([soup['href'][8:] for soup in hovercardable_soup]))
-		else:
-			return list(set([who for who in self._who_regexp.findall(self._data['note_html'])]))
+		return list(self._parse()['who'])
 
 	def when(self):
 		"""Returns UTC time as found in note_html.
@@ -219,25 +261,28 @@ class Conversation():
 	.. note::
 		Remember that you need to have access to the conversation.
 	"""
-	if not BS4_SUPPORT:
-		_message_stream_regexp = re.compile(r'<div class=["\']{1}stream["\']{1}>(.*?)<div class=["\']{1}stream-element new-message["\']{1}>', re.DOTALL)
-		_message_guid_regexp = re.compile(r'data-guid=["\']{1}([0-9]+)["\']{1}')
-		_message_created_at_regexp = re.compile(r'<time datetime=["\']{1}([0-9]{4}-[0-9]{2}-[0-9]{1,2}T[0-9]{1,2}:[0-9]{1,2}:[0-9]{1,2}Z)["\']{1}')
-		_message_body_regexp = re.compile(r'<div class=["\']{1}message-content["\']{1}>\s+<p>(.*?)</p>\s+</div>', re.DOTALL)
-		_message_author_guid_regexp = re.compile(r'<a href=["\']{1}/people/([a-f0-9]+)["\']{1} class=["\']{1}img')
-		_message_author_name_regexp = re.compile(r'<img alt=["\']{1}(.*?)["\']{1}.*')
-		_message_author_avatar_regexp = re.compile(r'src=["\']{1}(.*?)["\']{1}')
-	def __init__(self, connection, id, fetch=True):
+	_message_stream_regexp = re.compile(r'<div class=["\']{1}stream["\']{1}>(.*?)<div class=["\']{1}stream-element new-message["\']{1}>', re.DOTALL)
+	_message_guid_regexp = re.compile(r'data-guid=["\']{1}([0-9]+)["\']{1}')
+	_message_created_at_regexp = re.compile(r'<time datetime=["\']{1}([0-9]{4}-[0-9]{2}-[0-9]{1,2}T[0-9]{1,2}:[0-9]{1,2}:[0-9]{1,2}Z)["\']{1}')
+	_message_body_regexp = re.compile(r'<div class=["\']{1}message-content["\']{1}>\s+<p>(.*?)</p>\s+</div>', re.DOTALL)
+	_message_author_guid_regexp = re.compile(r'<a href=["\']{1}/people/([a-f0-9]+)["\']{1} class=["\']{1}img')
+	_message_author_name_regexp = re.compile(r'<img alt=["\']{1}(.*?)["\']{1}.*')
+	_message_author_avatar_regexp = re.compile(r'src=["\']{1}(.*?)["\']{1}')
+	def __init__(self, connection, id, fetch=True, data=None):
 		"""
 		:param conv_id: id of the post and not the guid!
 		:type conv_id: str
 		:param connection: connection object used to authenticate
 		:type connection: connection.Connection
+		:param data: data of the conversation (e.g. from the list of conversations), it is fetched on demand if it lacks a key
+		:type data: dict
 		"""
 		self._connection = connection
 		self.id = id
 		self._data = {}
+		self._fetched = False
 		self._messages = []
+		if data: self._data = data
 		if fetch: self._fetch()
 
 	def __len__(self): return len(self._messages)
@@ -248,11 +293,31 @@ class Conversation():
 		"""Fetches JSON data representing conversation.
 		"""
 		request = self._connection.get('conversations/{}.json'.format(self.id))
+		self._setdata(request)
+
+	async def _afetch(self):
+		"""Coroutine version of _fetch() for conversations using
+		diaspy.connection.AsyncConnection.
+		"""
+		request = await self._connection.get('conversations/{}.json'.format(self.id))
+		self._setdata(request)
+
+	def _setdata(self, request):
+		"""Sets data of the conversation from response to request for it.
+		"""
 		if request.status_code == 200:
 			self._data = request.json()['conversation']
+			self._fetched = True
 		else:
 			raise errors.ConversationError('cannot download conversation data: {0}'.format(request.status_code))
 
+	def data(self, key):
+		"""Returns a key from data of this conversation, fetching
+		full data if the key is missing.
+		"""
+		if key not in self._data and not self._fetched: self._fetch()
+		return self._data[key]
+
 	def _fetch_messages(self):
 		"""Fetches HTML data we will use to parse message data.
 		This is a workaround until Diaspora* has it's API plans implemented.
@@ -275,7 +340,7 @@ class Conversation():
 			}
 
 			if BS4_SUPPORT: # Parse the HTML with BS4
-				soup = BeautifulSoup(request.content, 'lxml')
+				soup = parsehtml(request.content)
 				messages_soup = soup.findAll('div', {"class": "stream-element message"})
 				for message_soup in messages_soup:
 					message = copy.deepcopy(message_template)
@@ -385,7 +450,7 @@ class Conversation():
 	def get_subject(self):
 		"""Returns the subject of this conversation
 		"""
-		return self._data['subject']
+		return self.data('subject')
 
 
 class Comment():
@@ -396,6 +461,7 @@ class Comment():
 	by `Comments()` objects wich automatically will be created by `Post()` 
 	objects.
 	"""
+	__slots__ = ('_data', 'id', 'guid')
 	def __init__(self, data):
 		self._data = data
 		self.id = data['id']
@@ -423,31 +489,56 @@ class Comment():
 		return self._data['author'][key]
 
 class Comments():
-	def __init__(self, comments=[]):
+	"""Comments of a post.
+
+	Comment() objects are created (and comments are fetched, if `loader`
+	is given) on first access, not when the object is created.
+	"""
+	__slots__ = ('_comments', '_json', '_loader')
+	def __init__(self, comments=None, loader=None):
+		"""
+		:param comments: list with Comment() objects
+		:type comments: list
+		:param loader: callable setting comments on first access (e.g. by fetching them)
+		"""
 		self._comments = comments
+		self._json = []
+		self._loader = loader
+
+	def _materialise(self):
+		"""Returns list of Comment() objects, creating them if needed.
+		"""
+		if self._comments is None:
+			if self._loader is not None:
+				loader, self._loader = self._loader, None
+				loader()
+			if self._comments is None:
+				self._comments = [Comment(c) for c in self._json]
+				self._json = []
+		return self._comments
 
 	def __iter__(self):
-		for comment in self._comments: yield comment
+		for comment in self._materialise(): yield comment
 
 	def __len__(self):
-		return len(self._comments)
+		return len(self._materialise())
 
 	def __getitem__(self, index):
-		if self._comments: return self._comments[index]
+		if self._materialise(): return self._comments[index]
 
 	def __bool__(self):
-		if self._comments: return True
+		if self._materialise(): return True
 		return False
 
 	def ids(self):
-		return [c.id for c in self._comments]
+		return [c.id for c in self._materialise()]
 
 	def add(self, comment):
 		""" Expects Comment() object
 
 		:param comment: Comment() object to add.
 		:type comment: Comment() object."""
-		if comment and type(comment) == Comment: self._comments.append(comment)
+		if comment and type(comment) == Comment: self._materialise().append(comment)
 
 	def set(self, comments):
 		"""Sets comments wich already have a Comment() obj
@@ -455,19 +546,30 @@ class Comments():
 		:param comments: list with Comment() objects to set.
 		:type comments: list.
 		"""
-		if comments: self._comments = comments
+		if comments is not None:
+			self._comments = comments
+			self._json = []
+			self._loader = None
 
 	def set_json(self, json_comments):
-		"""Sets comments for this post from post data."""
-		if json_comments:
-			self._comments = [Comment(c) for c in json_comments]
+		"""Sets comments for this post from post data.
+		Comment() objects are created on first access."""
+		self._comments = None
+		self._json = json_comments or []
 
 class Post():
 	"""This class represents a post.
 
+	Post is lazy: its data is fetched on first access (unless it was
+	passed as `post_data`) and its comments are fetched or created on
+	first access to `comments`. With diaspy.connection.AsyncConnection
+	nothing can be fetched on first access, await afetch() instead.
+
 	.. note::
 		Remember that you need to have access to the post.
 	"""
+	__slots__ = ('_connection', 'id', 'guid', '_raw', '_stale', 'comments')
+
 	def __init__(self, connection, id=0, guid='', fetch=True, comments=True, post_data=None):
 		"""
 		:param id: id of the post (GUID is recommended)
@@ -476,9 +578,9 @@ class Post():
 		:type guid: str
 		:param connection: connection object used to authenticate
 		:type connection: connection.Connection
-		:param fetch: defines whether to fetch post's data or not
+		:param fetch: defines whether to refresh `post_data` with data fetched from pod on first access
 		:type fetch: bool
-		:param comments: defines whether to fetch post's comments or not (if True also data will be fetched)
+		:param comments: defines whether to fetch post's comments on first access or use the ones embedded in its data
 		:type comments: bool
 		:param post_data: contains post data so no need to fetch the post if this is set, until you want to update post data
 		:type: json
@@ -487,18 +589,45 @@ class Post():
 		self._connection = connection
 		self.id = id
 		self.guid = guid
-		self._data = {}
-		self.comments = Comments()
-		if post_data:
-			self._data = post_data
+		self._raw = post_data or None
+		self._stale = bool(fetch and post_data)
+		if comments: self.comments = Comments(loader=self._fetchcomments)
+		else: self.comments = Comments(loader=self._embeddedcomments)
+
+	@property
+	def _data(self):
+		"""Data of the post, fetched on first access.
+		"""
+		if self._raw is None or self._stale:
+			self._synchronous('data')
+			self._stale = False
+			self._fetchdata()
+		return self._raw
+
+	@_data.setter
+	def _data(self, data):
+		self._raw = data
+		self._stale = False
+		if not self.id: self.id = data.get('id', 0)
+		if not self.guid: self.guid = data.get('guid', '')
 
-		if fetch: self._fetchdata()
-		if comments:
-			if not self._data: self._fetchdata()
-			self._fetchcomments()
-		else:
-			if not self._data: self._fetchdata()
-			self.comments.set_json( self.data()['interactions']['comments'] )
+	def __getitem__(self, key):
+		"""Returns a key from post data.
+		"""
+		return self._data[key]
+
+	def _synchronous(self, what):
+		"""Raises PostError if `what` is about to be fetched on first access
+		using diaspy.connection.AsyncConnection (requests could not be awaited).
+		"""
+		if self._connection.asynchronous:
+			raise errors.PostError('{0} of post {1} has to be fetched with `await post.afetch()` '
+								   'when using AsyncConnection'.format(what, self._dataid()))
+
+	def _embeddedcomments(self):
+		"""Sets comments of the post from its data (it contains only the latest ones).
+		"""
+		self.comments.set_json(self.data().get('interactions', {}).get('comments', []))
 
 	def __repr__(self):
 		"""Returns string containing more information then str().
@@ -515,13 +644,67 @@ class Post():
 
 		:returns: guid of post whose data was fetched
 		"""
+		id = self._dataid()
+		cached = self._cached()
+		request = self._connection.get('posts/{0}.json'.format(id), headers=self._validators(cached))
+		return self._setdata(request, id, cached)
+
+	async def _afetchdata(self):
+		"""Coroutine version of _fetchdata() for posts using
+		diaspy.connection.AsyncConnection.
+		"""
+		id = self._dataid()
+		cached = self._cached()
+		request = await self._connection.get('posts/{0}.json'.format(id), headers=self._validators(cached))
+		return self._setdata(request, id, cached)
+
+	def _cache(self):
+		"""Returns cache of posts used by connection of this post (or None).
+		"""
+		return self._connection.get_post_cache()
+
+	def _cached(self):
+		"""Returns cached entry for this post (or None).
+		"""
+		cache = self._cache()
+		if cache is None or not self.guid: return None
+		return cache.get(self.guid)
+
+	def _validators(self, cached):
+		"""Returns headers making request for post data conditional.
+		"""
+		headers = {}
+		if cached is None: return headers
+		if cached['etag']: headers['If-None-Match'] = cached['etag']
+		if cached['last_modified']: headers['If-Modified-Since'] = cached['last_modified']
+		return headers
+
+	def _dataid(self):
+		"""Returns identifier used to fetch data of the post (GUID is preferred).
+		"""
 		if self.id: id = self.id
 		if self.guid: id = self.guid
-		request = self._connection.get('posts/{0}.json'.format(id))
-		if request.status_code != 200:
+		return id
+
+	def _postid(self):
+		"""Returns id of the post used in URLs of writes
+		(data of the post is fetched if the id is not known yet).
+		"""
+		if not self.id: self.id = self._data['id']
+		return self.id
+
+	def _setdata(self, request, id, cached=None):
+		"""Sets data of the post from response to request for it.
+		"""
+		if request.status_code == 304 and cached is not None:
+			self._data = cached['data']
+		elif request.status_code != 200:
 			raise errors.PostError('{0}: could not fetch data for post: {1}'.format(request.status_code, id))
 		elif request:
 			self._data = request.json()
+			cache = self._cache()
+			if cache is not None:
+				cache.put(self._data, etag=request.headers.get('etag'), last_modified=request.headers.get('last-modified'))
 		return self.data()['guid']
 
 	def _fetchcomments(self):
@@ -529,13 +712,45 @@ class Post():
 		Retrieving comments via GUID will result in 404 error.
 		DIASPORA* does not supply comments through /posts/:guid/ endpoint.
 		"""
+		self._synchronous('comments')
 		id = self.data()['id']
-		if self.data()['interactions']['comments_count']:
+		if self.data()['interactions']['comments_count'] and not self._cachedcomments():
 			request = self._connection.get('posts/{0}/comments.json'.format(id))
-			if request.status_code != 200:
-				raise errors.PostError('{0}: could not fetch comments for post: {1}'.format(request.status_code, id))
-			else:
-				self.comments.set([Comment(c) for c in request.json()])
+			self._setcomments(request, id)
+
+	async def _afetchcomments(self):
+		"""Coroutine version of _fetchcomments() for posts using
+		diaspy.connection.AsyncConnection.
+		"""
+		id = self.data()['id']
+		if self.data()['interactions']['comments_count'] and not self._cachedcomments():
+			request = await self._connection.get('posts/{0}/comments.json'.format(id))
+			self._setcomments(request, id)
+
+	def _cachedcomments(self):
+		"""Sets comments of the post from cache if they are still valid
+		(comments counter did not change).
+
+		:returns: True if comments were taken from cache
+		"""
+		cache = self._cache()
+		if cache is None: return False
+		comments = cache.comments(self.data()['guid'], self.data()['interactions']['comments_count'])
+		if comments is None: return False
+		self.comments.set([Comment(c) for c in comments])
+		return True
+
+	def _setcomments(self, request, id):
+		"""Sets comments of the post from response to request for them.
+		"""
+		if request.status_code != 200:
+			raise errors.PostError('{0}: could not fetch comments for post: {1}'.format(request.status_code, id))
+		else:
+			comments = request.json()
+			self.comments.set([Comment(c) for c in comments])
+			cache = self._cache()
+			if cache is not None:
+				cache.putcomments(self.data()['guid'], comments, self.data()['interactions']['comments_count'])
 
 	def fetch(self, comments = False):
 		"""Fetches post data.
@@ -545,6 +760,21 @@ class Post():
 			self._fetchcomments()
 		return self
 
+	async def afetch(self, comments = False):
+		"""Coroutine version of fetch() for posts using
+		diaspy.connection.AsyncConnection.
+
+		Comments are settled here too, as they cannot be fetched on first
+		access: they are fetched if `comments` is True or the post was
+		created with `comments=True`.
+		"""
+		await self._afetchdata()
+		loader, self.comments._loader = self.comments._loader, None
+		if comments or loader == self._fetchcomments:
+			await self._afetchcomments()
+		elif loader is not None: loader()
+		return self
+
 	def data(self, data = None):
 		if data is not None:
 			self._data = data
@@ -558,7 +788,7 @@ class Post():
 		"""
 		data = {'authenticity_token': repr(self._connection)}
 
-		request = self._connection.post('posts/{0}/likes'.format(self.id),    
+		request = self._connection.post('posts/{0}/likes'.format(self._postid()),    
 										data=data,
 										headers={'accept': 'application/json'})
 
@@ -592,7 +822,7 @@ class Post():
 		"""
 		data = {'text': text,
 				'authenticity_token': repr(self._connection)}
-		request = self._connection.post('posts/{0}/comments'.format(self.id),
+		request = self._connection.post('posts/{0}/comments'.format(self._postid()),
 										data=data,
 										headers={'accept': 'application/json'})
 
@@ -610,9 +840,9 @@ class Post():
 		poll_id = self._data['poll']['poll_id']
 		data = {'poll_answer_id': poll_answer_id,
 				'poll_id': poll_id,
-				'post_id': self.id,
+				'post_id': self._postid(),
 				'authenticity_token': repr(self._connection)}
-		request = self._connection.post('posts/{0}/poll_participations'.format(self.id),
+		request = self._connection.post('posts/{0}/poll_participations'.format(self._postid()),
 										data=data,
 										headers={'accept': 'application/json'})
 		if request.status_code != 201:
@@ -627,7 +857,7 @@ class Post():
 		<-    HTTP/1.1 200 OK
 		"""
 		headers = {'x-csrf-token': repr(self._connection)}
-		params = {'post_id': json.dumps(self.id)}
+		params = {'post_id': json.dumps(self._postid())}
 		request = self._connection.put('share_visibilities/42', params=params, headers=headers)
 		if request.status_code != 200:
 			raise Exception('{0}: Failed to hide post.'
@@ -654,7 +884,7 @@ class Post():
 		headers = {'x-csrf-token': repr(self._connection)}
 		data = {}
 		request = self._connection.post('posts/{}/participation'
-							.format( self.id ), data=data, headers=headers)
+							.format(self._postid()), data=data, headers=headers)
 		if request.status_code != 201:
 			raise Exception('{0}: Failed to subscribe to post'
 							.format(request.status_code))
@@ -668,7 +898,7 @@ class Post():
 		headers = {'x-csrf-token': repr(self._connection)}
 		data = { "_method": "delete" }
 		request = self._connection.post('posts/{}/participation'
-							.format( self.id ), headers=headers, data=data)
+							.format(self._postid()), headers=headers, data=data)
 		if request.status_code != 200:
 			raise Exception('{0}: Failed to unsubscribe to post'
 							.format(request.status_code))
@@ -683,7 +913,7 @@ class Post():
 		""" This function deletes this post
 		"""
 		data = {'authenticity_token': repr(self._connection)}
-		request = self._connection.delete('posts/{0}'.format(self.id),
+		request = self._connection.delete('posts/{0}'.format(self._postid()),
 										  data=data,
 										  headers={'accept': 'application/json'})
 		if request.status_code != 204:
@@ -697,7 +927,7 @@ class Post():
 		"""
 		data = {'authenticity_token': repr(self._connection)}
 		request = self._connection.delete('posts/{0}/comments/{1}'
-										  .format(self.id, comment_id),
+										  .format(self._postid(), comment_id),
 										  data=data,
 										  headers={'accept': 'application/json'})
 
@@ -709,7 +939,7 @@ class Post():
 		"""This function removes a like from a post
 		"""
 		data = {'authenticity_token': repr(self._connection)}
-		url = 'posts/{0}/likes/{1}'.format(self.id, self._data['interactions']['likes'][0]['id'])
+		url = 'posts/{0}/likes/{1}'.format(self._postid(), self._data['interactions']['likes'][0]['id'])
 		request = self._connection.delete(url, data=data)
 		if request.status_code != 204:
 			raise errors.PostError('{0}: Like could not be removed.'
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 
+import collections
 import time
 
 from diaspy.models import Notification
@@ -13,11 +14,26 @@ from diaspy.models import Notification
 class Notifications():
 	"""This class represents notifications of a user.
 	"""
-	def __init__(self, connection):
+	def __init__(self, connection, fetch=True):
+		"""
+		:param connection: Connection() object
+		:type connection: diaspy.connection.Connection
+		:param fetch: will call .get() if true (pass False when using AsyncConnection and await .aget())
+		:type fetch: bool
+		"""
 		self._connection = connection
 		self._data = {}
-		self._notifications = self.get()
+		self._notifications = collections.deque()
+		self._index = {}
+		self.cursor = None
 		self.page = 1
+		if fetch: self._expand(self.get())
+
+	def __contains__(self, notification):
+		"""Checks if notification (or notification with given id) is known.
+		"""
+		if isinstance(notification, Notification): notification = notification.id
+		return notification in self._index
 
 	def __len__(self):
 		return len(self._notifications)
@@ -26,12 +42,15 @@ class Notifications():
 		return iter(self._notifications)
 
 	def __getitem__(self, n):
+		if isinstance(n, slice): return list(self._notifications)[n]
 		return self._notifications[n]
 
 	def _finalise(self, notifications):
 		self._data['unread_count'] = notifications['unread_count']
 		self._data['unread_count_by_type'] = notifications['unread_count_by_type']
-		return [Notification(self._connection, n) for n in notifications.get('notification_list', [])]
+		notifications = [Notification(self._connection, n) for n in notifications.get('notification_list', [])]
+		Notification.parseall(notifications)
+		return notifications
 
 	def last(self):
 		"""Returns list of most recent notifications.
@@ -45,43 +64,67 @@ class Notifications():
 			raise Exception('status code: {0}: cannot retrieve notifications'.format(request.status_code))
 		return self._finalise(request.json())
 
+	def _advance(self, notifications):
+		"""Moves cursor (id of the newest known notification) forward.
+		"""
+		for n in notifications:
+			if self.cursor is None or n.id > self.cursor: self.cursor = n.id
+
 	def _expand(self, new_notifications):
-		ids = [notification.id for notification in self._notifications]
-		notifications = self._notifications
-		data = self._data
+		"""Appends notifications that are not yet known.
+		"""
 		for n in new_notifications:
-			if n.id not in ids:
-				if n.unread:
-					data['unread_count'] +=1
-					data['unread_count_by_type'][n.type] +=1
-				notifications.append(n)
-				ids.append(n.id)
-		self._notifications = notifications
-		self._data = data
+			if n.id in self._index: continue
+			self._notifications.append(n)
+			self._index[n.id] = n
+		self._advance(new_notifications)
 
 	def _update(self, new_notifications):
-		ids = [notification.id for notification in self._notifications]
-		notifications = self._notifications
-		data = self._data
-
-		update = False
-		if new_notifications[len(new_notifications)-1].id not in ids:
-			update = True
-
-		for i in range(len(new_notifications)):
-			if new_notifications[-i].id not in ids:
-				if new_notifications[-i].unread:
-					data['unread_count'] +=1
-					data['unread_count_by_type'][new_notifications[-i].type] +=1
-				notifications = [new_notifications[-i]] + notifications
-				ids.append(new_notifications[-i].id)
-		self._notifications = notifications
-		self._data = data
-		if update: self.update() # if there is a gap
-
-	def update(self, per_page=5, page=1):
-		result = self.get(per_page=per_page, page=page)
-		if result: self._update( result )
+		"""Prepends notifications that are not yet known, keeping their
+		order (newest first).
+
+		:returns: number of new notifications
+		"""
+		fresh = []
+		for n in new_notifications:
+			# pages shift when notifications arrive while they are fetched,
+			# so the same notification can be found on two of them
+			if n.id in self._index: continue
+			self._index[n.id] = n
+			fresh.append(n)
+		for n in reversed(fresh): self._notifications.appendleft(n)
+		self._advance(fresh)
+		return len(fresh)
+
+	def _gap(self, notifications, per_page):
+		"""Returns True if there may be unknown notifications on the
+		page after the given one, i.e. the page was full and all of
+		its notifications are newer than the cursor.
+		"""
+		if self.cursor is None or len(notifications) < per_page: return False
+		return all(n.id > self.cursor for n in notifications)
+
+	def update(self, per_page=5, page=1, max_pages=10):
+		"""Fetches notifications newer than the known ones.
+
+		If the whole fetched page is new, following pages are fetched
+		until a known notification is met, but no more than `max_pages`
+		pages in total.
+
+		:param per_page: number of notifications per page
+		:type per_page: int
+		:param page: page to start with
+		:type page: int
+		:param max_pages: maximal number of pages fetched to fill a gap
+		:type max_pages: int
+		:returns: int, number of new notifications (added to the front)
+		"""
+		new_notifications = []
+		for page in range(page, page+max_pages):
+			result = self.get(per_page=per_page, page=page)
+			new_notifications.extend(result)
+			if not self._gap(result, per_page): break
+		return self._update(new_notifications)
 
 	def more(self, per_page=5, page=0):
 		if not page: page = self.page + 1
@@ -90,6 +133,13 @@ class Notifications():
 		if result:
 			self._expand( result )
 
+	def unread(self, type=None):
+		"""Returns number of unread notifications (of given type) as
+		reported by pod in the last response.
+		"""
+		if type is None: return self._data.get('unread_count', 0)
+		return self._data.get('unread_count_by_type', {}).get(type, 0)
+
 	def get(self, per_page=5, page=1):
 		"""Returns list of notifications.
 		"""
@@ -101,3 +151,29 @@ class Notifications():
 		if request.status_code != 200:
 			raise Exception('status code: {0}: cannot retreive notifications'.format(request.status_code))
 		return self._finalise(request.json())
+
+	async def aget(self, per_page=5, page=1):
+		"""Coroutine version of get() for notifications using
+		diaspy.connection.AsyncConnection.
+		"""
+		params = {'per_page': per_page, 'page': page}
+		headers = {'x-csrf-token': await self._connection.get_token(fetch=False)}
+
+		request = await self._connection.get('notifications.json', headers=headers, params=params)
+
+		if request.status_code != 200:
+			raise Exception('status code: {0}: cannot retreive notifications'.format(request.status_code))
+		return self._finalise(request.json())
+
+	async def aupdate(self, per_page=5, page=1, max_pages=10):
+		"""Coroutine version of update() for notifications using
+		diaspy.connection.AsyncConnection.
+
+		:returns: int, number of new notifications
+		"""
+		new_notifications = []
+		for page in range(page, page+max_pages):
+			result = await self.aget(per_page=per_page, page=page)
+			new_notifications.extend(result)
+			if not self._gap(result, per_page): break
+		return self._update(new_notifications)
@@ -1,5 +1,8 @@
 #!/usr/bin/env python3
 
+import collections
+import concurrent.futures
+import itertools
 import json
 import re
 import warnings
@@ -43,6 +46,8 @@ class User():
 	optional parameters. GUID takes precedence over handle when fetching
 	user stream. When fetching user data, handle is required.
 	"""
+	__slots__ = ('_connection', 'stream', 'data', 'photos')
+
 	@classmethod
 	def parse(cls, connection, data):
 		person = data.get('person')
@@ -259,6 +264,8 @@ class Me():
 class Contacts():
 	"""This class represents user's list of contacts.
 	"""
+	per_page = 25
+
 	def __init__(self, connection, fetch=False, set=''):
 		self._connection = connection
 		self.contacts = None
@@ -393,22 +400,70 @@ class Contacts():
 
 		:param set: if passed could be 'all' or 'only_sharing'
 		:type set: str
-		:param page: page number to get, default 0.
+		:param page: page number to start at, default 0 (the first page).
 		:type page: int
 		"""
+		return list(self.iter_contacts(set=set, page=(page or 1)))
+
+	def _params(self, set, page):
 		params = {}
 		if set:
 			params['set'] = set
 			params['_'] = int(time.mktime(time.gmtime()))
-			if page: params['page'] = page
+		if page > 1: params['page'] = page
+		return params
 
-		request = self._connection.get('contacts.json', params=params)
+	def _page(self, set='', page=1):
+		"""Returns list of contacts from given page.
+		"""
+		request = self._connection.get('contacts.json', params=self._params(set, page))
 		if request.status_code != 200:
 			raise Exception('status code {0}: cannot get contacts'.format(request.status_code))
+		return [User.parse(self._connection, each) for each in request.json()]
 
-		json = request.json()
-		users = [User.parse(self._connection, each) for each in json]
-		if len(json) == 25:
-			if not page: page = 1
-			users += self.get(set=set, page=page+1)
-		return users
+	def iter_contacts(self, set='', page=1, pages=None, workers=4):
+		"""Yields contacts page by page, without building list of all of
+		them. Next page is fetched while contacts from current one are
+		consumed.
+
+		If `pages` is given, only these pages are fetched, at most
+		`workers` of them at once; contacts are still yielded in order
+		of pages.
+
+		:param set: if passed could be 'all' or 'only_sharing'
+		:type set: str
+		:param page: page to start at
+		:type page: int
+		:param pages: known page numbers to fetch (e.g. range(1, 41))
+		:type pages: iterable of int
+		:param workers: maximal number of pages fetched at once
+		:type workers: int
+		"""
+		with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+			if pages is None: users = self._iterpages(executor, set, page)
+			else: users = self._iterknownpages(executor, set, pages, workers)
+			for user in users: yield user
+
+	def _iterpages(self, executor, set, page):
+		"""Yields contacts from pages following given one until a page
+		that is not full, fetching next page in executor.
+		"""
+		future = executor.submit(self._page, set, page)
+		while future is not None:
+			users = future.result()
+			# only a full page can be followed by another one
+			future = None
+			if len(users) == self.per_page: future = executor.submit(self._page, set, page+1)
+			page += 1
+			for user in users: yield user
+
+	def _iterknownpages(self, executor, set, pages, workers):
+		"""Yields contacts from given pages, fetching at most `workers`
+		of them at once in executor.
+		"""
+		pages = iter(pages)
+		pending = collections.deque(executor.submit(self._page, set, n) for n in itertools.islice(pages, workers))
+		while pending:
+			users = pending.popleft().result()
+			for n in itertools.islice(pages, 1): pending.append(executor.submit(self._page, set, n))
+			for user in users: yield user
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+"""This module provides limiting of rate of requests sent to pods.
+
+Every pod has one limiter shared by all threads and connections talking
+to it (see forpod()). Limiters are token buckets: at most `burst`
+requests can be sent at once and then `rate` requests per second.
+When pod answers 429 Too Many Requests or 503 Service Unavailable all
+requests to it are held back for the time given in Retry-After header
+(or an increasing delay if there is none) and the request is retried:
+
+	diaspy.ratelimit.forpod('https://pod.example.com', rate=5, burst=10)
+"""
+
+
+import email.utils
+import threading
+import time
+import urllib.parse
+
+
+class RateLimiter():
+	"""Token bucket limiting rate of requests sent to one pod.
+
+	Can be shared between threads.
+	"""
+	# status codes with which pods ask clients to slow down
+	retry_codes = (429, 503)
+
+	def __init__(self, rate=None, burst=1, max_retries=3, max_delay=60):
+		"""
+		:param rate: requests per second (None means no limit, Retry-After is still honored)
+		:type rate: float
+		:param burst: number of requests that can be sent at once
+		:type burst: int
+		:param max_retries: how many times request answered with 429 or 503 is retried
+		:type max_retries: int
+		:param max_delay: longest delay (in seconds) before retry, requests that would have to wait longer are not retried
+		:type max_delay: float
+		"""
+		self.rate = rate
+		self.burst = burst
+		self.max_retries = max_retries
+		self.max_delay = max_delay
+		self._lock = threading.Lock()
+		# theoretical arrival time of the next request
+		self._tat = 0
+
+	def reserve(self):
+		"""Reserves slot for a request.
+
+		:returns: number of seconds the caller has to wait before sending the request
+		"""
+		now = time.monotonic()
+		with self._lock:
+			if self.rate is None:
+				return max(0, self._tat - now)
+			interval = 1 / self.rate
+			tat = max(self._tat, now)
+			self._tat = tat + interval
+			return max(0, tat - (self.burst - 1) * interval - now)
+
+	def acquire(self):
+		"""Waits until a request can be sent.
+		"""
+		delay = self.reserve()
+		if delay: time.sleep(delay)
+
+	def block(self, delay):
+		"""Holds back all requests for given number of seconds.
+		"""
+		until = time.monotonic() + delay
+		with self._lock:
+			if self.rate is not None: until += (self.burst - 1) / self.rate
+			self._tat = max(self._tat, until)
+
+	def delay(self, response, attempt):
+		"""Returns number of seconds to wait before retrying request
+		rejected with given response, or None if it should not be retried.
+
+		:param attempt: number of retries made so far
+		:type attempt: int
+		"""
+		if response.status_code not in self.retry_codes or attempt >= self.max_retries: return None
+		delay = retryafter(response.headers.get('retry-after'))
+		if delay is None: delay = 2 ** attempt
+		if delay > self.max_delay: return None
+		return delay
+
+	def hold(self, response):
+		"""Holds back all requests for the time given in Retry-After
+		header of response with which pod asked to slow down, also when
+		the request is not retried (see delay()).
+		"""
+		if response.status_code not in self.retry_codes: return
+		delay = retryafter(response.headers.get('retry-after'))
+		if delay: self.block(delay)
+
+
+def retryafter(value):
+	"""Returns number of seconds from value of Retry-After header
+	(either seconds or HTTP date), or None if it cannot be parsed.
+	"""
+	if not value: return None
+	value = value.strip()
+	if value.isdigit(): return int(value)
+	try:
+		date = email.utils.parsedate_to_datetime(value)
+	except (TypeError, ValueError):
+		return None
+	return max(0, date.timestamp() - time.time())
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _podkey(pod):
+	"""Returns key identifying pod in the registry of limiters.
+	"""
+	netloc = urllib.parse.urlsplit(pod).netloc
+	return (netloc or pod).lower()
+
+
+def forpod(pod, **settings):
+	"""Returns limiter shared by all connections to given pod, creating
+	it if needed. Settings (see RateLimiter()) given here are applied to
+	the limiter.
+
+	:param pod: URL of the pod
+	:type pod: str
+	"""
+	key = _podkey(pod)
+	with _limiters_lock:
+		limiter = _limiters.get(key)
+		if limiter is None: limiter = _limiters[key] = RateLimiter()
+	for name, value in settings.items():
+		if not hasattr(limiter, name): raise TypeError('unknown limiter setting: {0}'.format(name))
+		setattr(limiter, name, value)
+	return limiter
@@ -4,20 +4,60 @@
 """
 
 
+import collections
+import concurrent.futures
 import json
 import os
-import urllib
+import re
 import warnings
+from xml.etree import ElementTree
 
-BS4_SUPPORT=False
-try:
-	from bs4 import BeautifulSoup
-except ImportError:
-	import re
-	print("[diaspy] BeautifulSoup not found, falling back on regex.")
-else: BS4_SUPPORT=True
+import requests
 
 from diaspy import errors, streams
+from diaspy.models import BS4_SUPPORT, parsehtml
+
+
+def _xmltodict(element):
+	"""Converts XML element to Python objects: elements without children
+	become their text, other ones dicts (children appearing more than
+	once become lists).
+	"""
+	if len(element) == 0: return element.text
+	data = {}
+	for child in element:
+		value = _xmltodict(child)
+		if child.tag not in data: data[child.tag] = value
+		elif isinstance(data[child.tag], list): data[child.tag].append(value)
+		else: data[child.tag] = [data[child.tag], value]
+	return data
+
+
+def iterxml(source, sections=('aspects', 'contacts', 'posts', 'comments')):
+	"""Yields items of account export (see Account.downloadxml()) one by
+	one, without loading the whole document into memory.
+
+	Items are children of sections of the export (e.g. <status_message>
+	elements of <posts> section) and are yielded as three-tuples:
+	(section, tag, data) where data are converted by the same rules as
+	JSON -- elements without children become strings and other ones dicts.
+
+	:param source: filename or file object (e.g. raw response) to read from
+	:param sections: names of sections to read (None means all of them)
+	:type sections: tuple of str
+	"""
+	stack = []
+	for event, element in ElementTree.iterparse(source, events=('start', 'end')):
+		if event == 'start':
+			stack.append(element)
+			continue
+		stack.pop()
+		if len(stack) != 2: continue
+		section = stack[1]
+		if sections is None or section.tag in sections:
+			yield (section.tag, element.tag, _xmltodict(element))
+		# item is processed, free it
+		section.remove(element)
 
 
 class Account():
@@ -27,24 +67,108 @@ class Account():
 		email_regexp = re.compile('<input id="user_email" name="user\[email\]" size="30" type="text" value="(.+?)"')
 		language_option_regexp = re.compile('<option value="([_a-zA-Z-]+)"(?: selected="selected")?>(.*?)</option>')
 
+	chunk_size = 64 * 1024
+
 	def __init__(self, connection):
 		self._connection = connection
 
-	def downloadxml(self):
+	def downloadxml(self, path=None):
 		"""Returns downloaded XML.
-		"""
-		request = self._connection.get('user/export')
-		return request.text
 
-	def downloadPhotos(self, size='large', path='.', mark_nsfw=True, _critical=False, _stream=None):
+		If `path` is given the export is streamed to this file in chunks
+		instead (it can be hundreds of megabytes big) and path is returned.
+		Use iterxml() to read it.
+
+		:param path: path of file to save export to
+		:type path: str
+		"""
+		if path is None:
+			request = self._connection.get('user/export')
+			return request.text
+		request = self._connection.get('user/export', stream=True)
+		try:
+			if request.status_code != 200:
+				raise errors.SettingsError('cannot download export: {0}'.format(request.status_code))
+			with open(path, 'wb') as ofstream:
+				for chunk in request.iter_content(chunk_size=self.chunk_size):
+					ofstream.write(chunk)
+		finally:
+			request.close()
+		return path
+
+	def _photos(self, posts, size, path, mark_nsfw):
+		"""Yields (post guid, photo guid, url, filename) of photos from given posts.
+		"""
+		for post in posts:
+			nsfw = ''
+			if mark_nsfw and post['nsfw'] is not False: nsfw = '-nsfw'
+			for photo in (post['photos'] or []):
+				url = photo['sizes'][size]
+				# photo format -- .jpg, .png etc.
+				ext = url.split('.')[-1]
+				name = '{0}_{1}{2}.{3}'.format(post['guid'], photo['guid'], nsfw, ext)
+				yield (post['guid'], photo['guid'], url, os.path.join(path, name))
+
+	def _downloadphoto(self, url, filename):
+		"""Streams photo to disk. Partially downloaded photo is kept in
+		`{filename}.part` file and its download is resumed next time.
+
+		:returns: False if photo was already present, True if it was downloaded
+		"""
+		if os.path.exists(filename): return False
+		part = filename + '.part'
+		offset = (os.path.getsize(part) if os.path.exists(part) else 0)
+		headers = ({'Range': 'bytes={0}-'.format(offset)} if offset else {})
+		request = self._connection.get(url, headers=headers, direct=True, stream=True)
+		try:
+			if request.status_code == 416: return self._unsatisfiable(request, url, filename)
+			self._savephoto(request, url, part, offset)
+		finally:
+			request.close()
+		os.replace(part, filename)
+		return True
+
+	def _unsatisfiable(self, request, url, filename):
+		"""Handles 416 answer to request for the rest of a photo.
+		Partially downloaded photo is complete only if its size is the
+		total size the server sends in Content-Range, otherwise the photo
+		changed on the server and is downloaded again.
+		"""
+		part = filename + '.part'
+		total = re.match(r'bytes \*/(\d+)$', request.headers.get('content-range', ''))
+		if total is None or os.path.getsize(part) != int(total.group(1)):
+			os.remove(part)
+			return self._downloadphoto(url, filename)
+		os.replace(part, filename)
+		return True
+
+	def _savephoto(self, request, url, part, offset):
+		"""Writes photo (or the rest of it if offset is not 0) from response
+		to the `.part` file and checks its size.
+		"""
+		if request.status_code not in (200, 206):
+			raise errors.DiaspyError('wrong status code: {0}'.format(request.status_code))
+		# server ignored Range header and sends whole photo
+		if request.status_code == 200: offset = 0
+		with open(part, ('ab' if offset else 'wb')) as ofstream:
+			for chunk in request.iter_content(chunk_size=self.chunk_size): ofstream.write(chunk)
+		expected = request.headers.get('content-length')
+		if expected is not None and os.path.getsize(part) != offset + int(expected):
+			raise errors.DiaspyError('incomplete download: {0}'.format(url))
+
+	def downloadPhotos(self, size='large', path='.', mark_nsfw=True, workers=4, _critical=False, _stream=None):
 		"""Downloads photos into the current working directory.
 		Sizes are: large, medium, small.
 		Filename is: {post_guid}_{photo_guid}.{extension}
 
-		Normally, this method will catch urllib-generated errors and
+		Photos are downloaded by a pool of `workers` threads while
+		activity stream is still being fetched. Photos already present
+		in `path` are skipped and interrupted downloads are resumed.
+
+		Normally, this method will catch download errors and
 		just issue warnings about photos that couldn't be downloaded.
 		However, with _critical param set to True errors will become
-		critical - the will be reraised in finally block.
+		critical - they will be reraised.
 
 		:param size: size of the photos to download - large, medium or small
 		:type size: str
@@ -52,35 +176,40 @@ class Account():
 		:type path: str
 		:param mark_nsfw: will append '-nsfw' to images from posts marked as nsfw,
 		:type mark_nsfw: bool
+		:param workers: maximal number of simultaneous downloads
+		:type workers: int
 		:param _stream: diaspy.streams.Generic-like object (only for testing)
-		:param _critical: if True urllib errors will be reraised after generating a warning (may be removed)
+		:param _critical: if True download errors will be reraised after generating a warning (may be removed)
 
-		:returns: integer, number of photos downloaded
+		:returns: integer, number of photos downloaded (not counting the ones already present)
 		"""
+		# only fields needed for photos are kept so comments are never fetched
+		if _stream is None: posts = streams.Activity(self._connection, fetch=False, fields=('photos', 'nsfw')).iter_posts()
+		else: posts = _stream
 		photos = 0
-		if _stream is None:
-			stream = streams.Activity(self._connection)
-			stream.full()
-		else:
-			stream = _stream
-		for i, post in enumerate(stream):
-			if post['nsfw'] is not False: nsfw = '-nsfw'
-			else: nsfw = ''
-			if post['photos']:
-				for n, photo in enumerate(post['photos']):
-					# photo format -- .jpg, .png etc.
-					ext = photo['sizes'][size].split('.')[-1]
-					name = '{0}_{1}{2}.{3}'.format(post['guid'], photo['guid'], nsfw, ext)
-					filename = os.path.join(path, name)
-					try:
-						urllib.request.urlretrieve(url=photo['sizes'][size], filename=filename)
-					except (urllib.error.HTTPError, urllib.error.URLError) as e:
-						warnings.warn('downloading image {0} from post {1}: {2}'.format(photo['guid'], post['guid'], e))
-					finally:
-						if _critical: raise
-				photos += 1
+		pending = collections.deque()
+		with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+			for post_guid, photo_guid, url, filename in self._photos(posts, size, path, mark_nsfw):
+				pending.append((post_guid, photo_guid, executor.submit(self._downloadphoto, url, filename)))
+				# do not let the stream get too far ahead of downloads
+				if len(pending) >= 2*workers: photos += self._finished(pending.popleft(), _critical)
+			while pending: photos += self._finished(pending.popleft(), _critical)
 		return photos
 
+	def _finished(self, download, critical=False):
+		"""Waits for download of a photo to finish.
+		Errors are turned into warnings (and reraised if `critical` is True).
+
+		:returns: 1 if photo was downloaded, 0 if it was already present or download failed
+		"""
+		post_guid, photo_guid, future = download
+		try:
+			return int(future.result())
+		except (requests.exceptions.RequestException, errors.DiaspyError, OSError) as e:
+			warnings.warn('downloading image {0} from post {1}: {2}'.format(photo_guid, post_guid, e))
+			if critical: raise
+		return 0
+
 	def setEmail(self, email):
 		"""Changes user's email.
 		"""
@@ -94,7 +223,7 @@ class Account():
 		"""
 		data = self._connection.get('user/edit')
 		if BS4_SUPPORT:
-			soup = BeautifulSoup(data.text, 'lxml')
+			soup = parsehtml(data.text)
 			email = soup.find('input', {"id": "user_email"})
 			if email: email = email['value']
 			else: email = ''
@@ -121,7 +250,7 @@ class Account():
 		"""
 		request = self._connection.get('user/edit')
 		if BS4_SUPPORT:
-			soup = BeautifulSoup(request.text, 'lxml')
+			soup = parsehtml(request.text)
 			language = soup.find('select', {"id": "user_language"})
 			return [(option['value'], option.text) for option in language.findAll('option')]
 		else:
@@ -138,6 +267,9 @@ class Privacy():
 class Profile():
 	"""Provides interface to profile settigns.
 
+	HTML of the profile is parsed once, the first time any of the getters
+	is called.
+
 	WARNING:
 
 		Because of the way update requests for profile are created every field must be sent.
@@ -174,6 +306,7 @@ class Profile():
 					'profile[date][day]': '',
 					}
 		self._html = self._fetchhtml()
+		self._fields = None
 		self._loaded = False
 		if not no_load: self.load()
 
@@ -182,18 +315,73 @@ class Profile():
 		"""
 		return self._connection.get('profile/edit').text
 
+	def _extract(self):
+		"""Extracts all profile values from HTML in a single pass.
+		Values are cached so getters do not parse HTML again.
+
+		:returns: dict
+		"""
+		if self._fields is not None: return self._fields
+		if BS4_SUPPORT: fields = self._extractsoup(parsehtml(self._html))
+		else: fields = self._extractregexp(self._html)
+		self._fields = fields
+		return fields
+
+	def _extractsoup(self, soup):
+		"""Extracts profile values from parsed HTML.
+		"""
+		def value(id):
+			return soup.find('input', {"id": id})['value']
+
+		def selected(id):
+			option = soup.find('select', {"id": id}).find('option', selected=True)
+			if option is None: return (-1, '')
+			return (int(option['value']), option.text)
+
+		def checked(id):
+			checkbox = soup.find('input', {"id": id})
+			return checkbox.has_attr('checked') and checkbox['checked'] == 'checked'
+
+		month, month_name = selected('profile_date_month')
+		return {'first_name': value('profile_first_name'),
+				'last_name': value('profile_last_name'),
+				'bio': soup.find('textarea', {"id": "profile_bio"}).get_text(),
+				'location': value('profile_location'),
+				'gender': value('profile_gender'),
+				'birth_year': selected('profile_date_year')[0],
+				'birth_month': month,
+				'birth_month_name': month_name,
+				'birth_day': selected('profile_date_day')[0],
+				'searchable': checked('profile_searchable'),
+				'nsfw': checked('profile_nsfw'),
+				}
+
+	def _extractregexp(self, html):
+		"""Extracts profile values from HTML using regular expressions.
+		"""
+		year = self.birth_year_regexp.search(html)
+		month = self.birth_month_regexp.search(html)
+		day = self.birth_day_regexp.search(html)
+		# value="true" in every case so we just check if the field is "checked"
+		# if it isn't - the regexp just won't match
+		return {'first_name': self.firstname_regexp.search(html).group(1),
+				'last_name': self.lastname_regexp.search(html).group(1),
+				'bio': self.bio_regexp.search(html).group(1),
+				'location': self.location_regexp.search(html).group(1),
+				'gender': self.gender_regexp.search(html).group(1),
+				'birth_year': (int(year.group(1)) if year is not None else -1),
+				'birth_month': (int(month.group(1)) if month is not None else -1),
+				'birth_month_name': (month.group(2) if month is not None else ''),
+				'birth_day': (int(day.group(1)) if day is not None else -1),
+				'searchable': self.is_searchable_regexp.search(html) is not None,
+				'nsfw': self.is_nsfw_regexp.search(html) is not None,
+				}
+
 	def getName(self):
 		"""Returns two-tuple: (first, last) name.
 		"""
-		if BS4_SUPPORT:
-			soup = BeautifulSoup(self._html, 'lxml')
-			first = soup.find('input', {"id": "profile_first_name"})
-			last = soup.find('input', {"id": "profile_last_name"})
-			return (first['value'], last['value'])
-		else:
-			first = self.firstname_regexp.search(self._html).group(1)
-			last = self.lastname_regexp.search(self._html).group(1)
-			return (first, last)
+		fields = self._extract()
+		return (fields['first_name'], fields['last_name'])
 
 	def getTags(self):
 		"""Returns tags user had selected when describing him/her-self.
@@ -201,7 +389,7 @@ class Profile():
 		guid = self._connection.getUserData()['guid']
 		html = self._connection.get('people/{0}'.format(guid)).text
 		if BS4_SUPPORT:
-			soup = BeautifulSoup(html, 'lxml')
+			soup = parsehtml(html)
 			tags = soup.find('meta', {"name": "keywords"})
 			return [tag.lower() for tag in tags['content'].split(", ")]
 		else:
@@ -211,35 +399,17 @@ class Profile():
 	def getBio(self):
 		"""Returns user bio.
 		"""
-		if BS4_SUPPORT:
-			soup = BeautifulSoup(self._html, 'lxml')
-			bio = soup.find('textarea', {"id": "profile_bio"})
-			return bio.get_text()
-		else:
-			bio = self.bio_regexp.search(self._html).group(1)
-			return bio
+		return self._extract()['bio']
 
 	def getLocation(self):
 		"""Returns location string.
 		"""
-		if BS4_SUPPORT:
-			soup = BeautifulSoup(self._html, 'lxml')
-			location = soup.find('input', {"id": "profile_location"})
-			return location['value']
-		else:
-			location = self.location_regexp.search(self._html).group(1)
-			return location
+		return self._extract()['location']
 
 	def getGender(self):
 		"""Returns location string.
 		"""
-		if BS4_SUPPORT:
-			soup = BeautifulSoup(self._html, 'lxml')
-			gender = soup.find('input', {"id": "profile_gender"})
-			return gender['value']
-		else:
-			gender = self.gender_regexp.search(self._html).group(1)
-			return gender
+		return self._extract()['gender']
 
 	def getBirthDate(self, named_month=False):
 		"""Returns three-tuple: (year, month, day).
@@ -247,79 +417,20 @@ class Profile():
 		:param named_month: if True, return name of the month instead of integer
 		:type named_month: bool
 		"""
-		if BS4_SUPPORT:
-			soup = BeautifulSoup(self._html, 'lxml')
-
-			year = soup.find('select', {"id": "profile_date_year"})
-			year_option = year.find('option', selected=True)
-			if year_option is None: year_option = -1
-			else: year_option = int(year_option['value'])
-
-			month = soup.find('select', {"id": "profile_date_month"})
-			month_option = month.find('option', selected=True)
-			if month_option is None:
-				if named_month: month_option = ''
-				else: month_option = -1
-			elif named_month:
-				month_option = month_option.text
-			else: month_option = int(month_option['value'])
-
-			day = soup.find('select', {"id": "profile_date_day"})
-			day_option = day.find('option', selected=True)
-			if day_option is None: day_option = -1
-			else: day_option = int(day_option['value'])
-			return (year_option, month_option, day_option)
-		else:
-			year = self.birth_year_regexp.search(self._html)
-			if year is None: year = -1
-			else: year = int(year.group(1))
-			month = self.birth_month_regexp.search(self._html)
-			if month is None:
-				if named_month: month = ''
-				else: month = -1
-			else:
-				if named_month:
-					month = month.group(2)
-				else:
-					month = int(month.group(1))
-			day = self.birth_day_regexp.search(self._html)
-			if day is None: day = -1
-			else: day = int(day.group(1))
-			return (year, month, day)
+		fields = self._extract()
+		if named_month: month = fields['birth_month_name']
+		else: month = fields['birth_month']
+		return (fields['birth_year'], month, fields['birth_day'])
 
 	def isSearchable(self):
 		"""Returns True if profile is searchable.
 		"""
-		if BS4_SUPPORT:
-			soup = BeautifulSoup(self._html, 'lxml')
-			searchable = soup.find('input', {"id": "profile_searchable"})
-			if (searchable.has_attr('checked') and
-					searchable['checked'] == 'checked'):
-				return True
-			else: return False
-		else:
-			searchable = self.is_searchable_regexp.search(self._html)
-			# this is because value="true" in every case so we just
-			# check if the field is "checked"
-			if searchable is None: searchable = False  # if it isn't - the regexp just won't match
-			else: searchable = True
-			return searchable
+		return self._extract()['searchable']
 
 	def isNSFW(self):
 		"""Returns True if profile is marked as NSFW.
 		"""
-		if BS4_SUPPORT:
-			soup = BeautifulSoup(self._html, 'lxml')
-			nsfw = soup.find('input', {"id": "profile_nsfw"})
-			if (nsfw.has_attr('checked') and
-					nsfw['checked'] == 'checked'):
-				return True
-			else: return False
-		else:
-			nsfw = self.is_nsfw_regexp.search(self._html)
-			if nsfw is None: nsfw = False
-			else: nsfw = True
-			return nsfw
+		return self._extract()['nsfw']
 
 	def setName(self, first, last):
 		"""Set first and last name.
@@ -5,10 +5,15 @@ Documentation for D* JSON API taken from:
 http://pad.spored.de/ro/r.qWmvhSZg7rk4OQam
 """
 
+import asyncio
+import collections
+import concurrent.futures
 import os
 import json
 import time
+import warnings
 from diaspy.models import Post, Aspect
+from diaspy.concurrency import concurrently
 from diaspy import errors
 
 """
@@ -17,36 +22,88 @@ Remember created_at is in UTC
 We need this to get a UTC timestamp from the latest loaded post in the 
 stream, so we can use it for the more() function.
 """
-import dateutil.parser
 def parse_utc_timestamp(date_str):
+	# dateutil is slow to import, it is imported on first use
+	import dateutil.parser
 	return round(dateutil.parser.parse(date_str).timestamp())
 
+
+def project(data, fields):
+	"""Returns copy of data containing only given fields.
+
+	:param data: post data
+	:type data: dict
+	:param fields: dotted paths of fields to keep, e.g. 'author.guid'
+	:type fields: iterable of str
+	"""
+	projection = {}
+	for field in fields:
+		keys = field.split('.')
+		source = data
+		for key in keys:
+			if not isinstance(source, dict) or key not in source: break
+			source = source[key]
+		else:
+			target = projection
+			for key in keys[:-1]: target = target.setdefault(key, {})
+			target[keys[-1]] = source
+	return projection
+
+
 class Generic():
 	"""Object representing generic stream.
+
+	If connection has cache of posts (see diaspy.cache) every page of the
+	stream is stored in it and comments are fetched only for posts whose
+	comments counter changed.
+
+	Posts are kept in order (newest first) and indexed by their GUIDs so
+	merging new pages, `in` checks and lookups (`stream[guid]`) do not
+	depend on the length of the stream.
+
+	Comments of posts are fetched concurrently, at most `comment_workers`
+	requests at once.
+
+	If `fields` are given posts keep only these fields of their data
+	(and the ones diaspy needs: id, guid, created_at and
+	interactions.comments_count). Comments are
+	fetched only if 'interactions' or 'interactions.comments' is among them.
 	"""
 	_location = 'stream.json'
+	_required_fields = ('id', 'guid', 'created_at', 'interactions.comments_count')
+	comment_workers = 8
 
-	def __init__(self, connection, location='', fetch=True):
+	def __init__(self, connection, location='', fetch=True, fields=None):
 		"""
 		:param connection: Connection() object
 		:type connection: diaspy.connection.Connection
 		:param location: location of json (optional)
 		:type location: str
-		:param fetch: will call .fill() if true
+		:param fetch: will call .fill() if true (pass False when using AsyncConnection and await .afill())
 		:type fetch: bool
+		:param fields: dotted paths of fields of post data to keep, e.g. ['text', 'author.guid']
+			(optional, all are kept by default)
+		:type fields: list of str
 		"""
 		self._connection = connection
 		if location: self._location = location
+		self._fields = None
+		if fields is not None: self._fields = tuple(fields) + self._required_fields
 		self.latest = None
-		self._stream = []
+		self._validators = {}
+		self._stream = collections.deque()
+		self._index = {}
 		#   since epoch
 		self.max_time = int(time.mktime(time.gmtime()))
 		if fetch: self.fill()
 
 	def __contains__(self, post):
 		"""Returns True if stream contains given post.
+
+		:param post: post or its GUID
+		:type post: diaspy.models.Post or str
 		"""
-		return post in self._stream
+		return getattr(post, 'guid', post) in self._index
 
 	def __iter__(self):
 		"""Provides iterable interface for stream.
@@ -54,8 +111,11 @@ class Generic():
 		return iter(self._stream)
 
 	def __getitem__(self, n):
-		"""Returns n-th item in Stream.
+		"""Returns n-th item in Stream or post with given GUID if `n`
+		is a string.
 		"""
+		if isinstance(n, str): return self._index[n]
+		if isinstance(n, slice): return list(self._stream)[n]
 		return self._stream[n]
 
 	def __len__(self):
@@ -63,10 +123,69 @@ class Generic():
 		"""
 		return len(self._stream)
 
-	def _obtain(self, max_time=0, suppress=True):
+	def _obtain(self, max_time=0, suppress=True, new=False, conditional=False):
 		"""Obtains stream from pod.
 
 		suppress:bool - suppress post-fetching errors (e.g. 404)
+		new:bool - return only posts that are not in the stream yet
+		conditional:bool - return None if the first page has not changed since it was last obtained
+		"""
+		request = self._connection.get(self._location, headers=self._headers(conditional),
+									   params=self._params(max_time))
+		posts = self._page(request, max_time, new, conditional)
+		if posts is None: return None
+		failed = self._fetchcomments(self._uncommented(posts))
+		self._reraise(failed.values(), suppress)
+		return posts
+
+	async def _aobtain(self, max_time=0, suppress=True, new=False, conditional=False):
+		"""Obtains stream from pod using diaspy.connection.AsyncConnection.
+		See _obtain().
+		"""
+		request = await self._connection.get(self._location, headers=self._headers(conditional),
+											 params=self._params(max_time))
+		posts = self._page(request, max_time, new, conditional)
+		if posts is None: return None
+		results = await asyncio.gather(*[post._afetchcomments() for post in self._uncommented(posts)],
+										return_exceptions=True)
+		self._reraise([result for result in results if isinstance(result, BaseException)], suppress)
+		return posts
+
+	def _page(self, request, max_time, new, conditional):
+		"""Returns posts from response to request for stream page
+		(None if the page has not changed, see _obtain()).
+		"""
+		if conditional and request.status_code == 304: return None
+		if request.status_code != 200:
+			raise errors.StreamError('wrong status code: {0}'.format(request.status_code))
+		if not max_time: self._remember(request)
+		posts = self._finalise(request.json())
+		if new: posts = [post for post in posts if post.guid not in self._index]
+		return posts
+
+	def _reraise(self, failures, suppress):
+		"""Reraises errors raised while fetching comments of posts,
+		unless they are PostErrors (e.g. 404) and `suppress` is True.
+		"""
+		for error in failures:
+			if not (suppress and isinstance(error, errors.PostError)): raise error
+
+	def _headers(self, conditional=False):
+		"""Returns headers of request for stream page.
+		"""
+		if conditional: return dict(self._validators)
+		return {}
+
+	def _remember(self, request):
+		"""Remembers validators (ETag, Last-Modified) of the first page
+		of the stream so it can be requested conditionally.
+		"""
+		self._validators = {}
+		if request.headers.get('etag'): self._validators['If-None-Match'] = request.headers.get('etag')
+		if request.headers.get('last-modified'): self._validators['If-Modified-Since'] = request.headers.get('last-modified')
+
+	def _params(self, max_time=0):
+		"""Returns parameters of request for stream page.
 		"""
 		params = {}
 		if max_time:
@@ -76,51 +195,80 @@ class Generic():
 			else: self.latest += 1
 			params['max_time'] = max_time
 			params['_'] = self.latest
-		request = self._connection.get(self._location, params=params)
-		if request.status_code != 200:
-			raise errors.StreamError('wrong status code: {0}'.format(request.status_code))
-		posts = []
-		latest_time = None # Used to get the created_at from the latest posts we received.
-		for post in request.json():
-			try:
-				comments = False
-				if post['interactions']['comments_count'] > 3: comments = True
-				posts.append(Post(self._connection, id=post['id'], guid=post['guid'], fetch=False, comments=comments, post_data=post))
-				if post['created_at']: latest_time = post['created_at']
-			except errors.PostError:
-				if not suppress:
-					raise
-		if latest_time:
-			self.max_time = parse_utc_timestamp( latest_time )
+		return params
+
+	def _finalise(self, data):
+		"""Creates posts from stream data obtained from pod.
+		Only comments embedded in the data are set, posts having more
+		of them have to be completed with _fetchcomments().
+		"""
+		self._store(data)
+		posts = [Post(self._connection, id=post['id'], guid=post['guid'], fetch=False, comments=False,
+					  post_data=self._project(post)) for post in data]
+		# created_at of the oldest post received is where the next page starts
+		created = [post['created_at'] for post in data if post['created_at']]
+		if created: self.max_time = parse_utc_timestamp(created[-1])
 		return posts
 
+	def _store(self, data):
+		"""Stores stream data in cache of posts (if connection has one).
+		"""
+		cache = self._connection.get_post_cache()
+		if cache is not None: cache.putmany(data)
+
+	def _project(self, post_data):
+		"""Returns post data reduced to the fields kept by the stream.
+		"""
+		if self._fields is None: return post_data
+		return project(post_data, self._fields)
+
+	def _uncommented(self, posts):
+		"""Returns posts having more comments than embedded in their data
+		(unless comments are projected away).
+		"""
+		if self._fields is not None and not ({'interactions', 'interactions.comments'} & set(self._fields)):
+			return []
+		return [post for post in posts if post.data()['interactions']['comments_count'] > 3]
+
+	def _fetchcomments(self, posts, workers=None):
+		"""Fetches comments of given posts concurrently.
+
+		:param posts: posts to fetch comments for
+		:type posts: list of diaspy.models.Post
+		:param workers: maximal number of simultaneous requests (defaults to comment_workers)
+		:type workers: int
+		:returns: dict mapping posts to errors raised while fetching their comments
+		"""
+		if workers is None: workers = self.comment_workers
+		return concurrently(lambda post: post._fetchcomments(), posts, workers)
+
 	def _expand(self, new_stream):
 		"""Appends older posts to stream.
 		"""
-		guids = [post.guid for post in self._stream]
-		stream = self._stream
 		for post in new_stream:
-			if post.guid not in guids:
-				stream.append(post)
-				guids.append(post.guid)
-		self._stream = stream
+			if post.guid not in self._index:
+				self._stream.append(post)
+				self._index[post.guid] = post
 
 	def _update(self, new_stream):
 		"""Updates stream with new posts.
 		"""
-		guids = [post.guid for post in self._stream]
+		for post in reversed(new_stream):
+			if post.guid not in self._index:
+				self._stream.appendleft(post)
+				self._index[post.guid] = post
 
-		stream = self._stream
-		for i in range(len(new_stream)):
-			if new_stream[-i].guid not in guids:
-				stream = [new_stream[-i]] + stream
-				guids.append(new_stream[-i].guid)
-		self._stream = stream
+	def _set(self, posts):
+		"""Replaces contents of the stream with given posts.
+		"""
+		self.clear()
+		self._expand(posts)
 
 	def clear(self):
 		"""Set stream to empty.
 		"""
-		self._stream = []
+		self._stream = collections.deque()
+		self._index = {}
 
 	def purge(self):
 		"""Removes all unexistent posts from stream.
@@ -135,12 +283,12 @@ class Generic():
 				deleted = True
 			finally:
 				if not deleted: stream.append(post)
-		self._stream = stream
+		self._set(stream)
 
 	def update(self):
 		"""Updates stream with new posts.
 		"""
-		self._update(self._obtain())
+		self._update(self._obtain(new=True))
 
 	def fill(self):
 		"""Fills the stream with posts.
@@ -148,7 +296,7 @@ class Generic():
 		**Notice:** this will create entirely new list of posts.
 		If you want to preseve posts already present in stream use update().
 		"""
-		self._stream = self._obtain()
+		self._set(self._obtain())
 
 	def more(self, max_time=0):
 		"""Tries to download more (older posts) posts from Stream.
@@ -159,9 +307,78 @@ class Generic():
 
 		if not max_time: max_time = self.max_time
 		self.max_time = max_time
-		new_stream = self._obtain(max_time=max_time)
+		new_stream = self._obtain(max_time=max_time, new=True)
 		self._expand(new_stream)
 
+	async def aupdate(self):
+		"""Coroutine version of update() for streams using
+		diaspy.connection.AsyncConnection.
+		"""
+		self._update(await self._aobtain(new=True))
+
+	async def afill(self):
+		"""Coroutine version of fill() for streams using
+		diaspy.connection.AsyncConnection.
+		"""
+		self._set(await self._aobtain())
+
+	async def amore(self, max_time=0):
+		"""Coroutine version of more() for streams using
+		diaspy.connection.AsyncConnection.
+		"""
+		if not max_time: max_time = self.max_time
+		self.max_time = max_time
+		self._expand(await self._aobtain(max_time=max_time, new=True))
+
+	def _poll(self, posts, interval, min_interval, max_interval):
+		"""Adds new posts to the stream and returns interval of the next
+		poll: halved if there were new posts, doubled if there were not.
+		"""
+		if posts: interval /= 2
+		else: interval *= 2
+		if posts: self._update(posts)
+		return max(min_interval, min(max_interval, interval))
+
+	def watch(self, interval=30, min_interval=5, max_interval=600):
+		"""Yields new posts (the ones not in the stream yet) as they
+		appear, oldest first. New posts are also added to the stream.
+		Fill the stream first unless posts already on its first page
+		should be yielded too.
+
+		Polling interval adapts to the stream: it is halved (down to
+		`min_interval`) after a poll that brought new posts and doubled
+		(up to `max_interval`) after a poll that did not.
+		Polls are conditional requests (ETag/Last-Modified), so if pod
+		supports them an unchanged stream is not downloaded again.
+
+		:param interval: seconds before the second poll
+		:type interval: int
+		:param min_interval: shortest interval between polls
+		:type min_interval: int
+		:param max_interval: longest interval between polls
+		:type max_interval: int
+		"""
+		while True:
+			# polling must not move the cursor used by more()
+			max_time = self.max_time
+			posts = self._obtain(new=True, conditional=True)
+			self.max_time = max_time
+			interval = self._poll(posts, interval, min_interval, max_interval)
+			for post in reversed(posts or []): yield post
+			time.sleep(interval)
+
+	async def awatch(self, interval=30, min_interval=5, max_interval=600):
+		"""Asynchronous generator version of watch() for streams using
+		diaspy.connection.AsyncConnection.
+		"""
+		while True:
+			max_time = self.max_time
+			posts = await self._aobtain(new=True, conditional=True)
+			self.max_time = max_time
+			interval = self._poll(posts, interval, min_interval, max_interval)
+			for post in reversed(posts or []): yield post
+			await asyncio.sleep(interval)
+
 	def full(self, backtime=None, retry=None, callback=None):
 		"""Fetches full stream - containing all posts.
 		WARNING: this is a **VERY** long running function.
@@ -184,32 +401,69 @@ class Generic():
 		if retry != None:
 			print("FIXME: diaspy.streams.Generic.full param retry is deprecated, it is needed any more. Please adjust your code.");
 
-		oldstream = self.copy()
+		length = len(self)
 		self.more()
-		while len(oldstream) < len(self):
-			oldstream = self.copy()
+		while length < len(self):
+			length = len(self)
 			if callback is not None: callback(self)
 			self.more()
 		return len(self)
 
+	def iter_pages(self, max_time=0):
+		"""Yields pages (lists of posts) of the stream going back in time
+		until the oldest post is reached.
+
+		Posts are not added to the stream so history of any length
+		can be processed in constant memory, as soon as pages arrive.
+		Like more(), it starts at and moves the `max_time` cursor of the stream.
+
+		:param max_time: seconds since epoch (optional, defaults to the cursor)
+		:type max_time: int
+		"""
+		if not max_time: max_time = self.max_time
+		previous = set()
+		while True:
+			# posts created in the same second may show up on two pages
+			page = [post for post in self._obtain(max_time=max_time) if post.guid not in previous]
+			if not page: break
+			yield page
+			previous = set(post.guid for post in page)
+			max_time = self.max_time
+
+	def iter_posts(self, max_time=0):
+		"""Yields posts of the stream one by one going back in time.
+		See iter_pages().
+
+		:param max_time: seconds since epoch (optional, defaults to the cursor)
+		:type max_time: int
+		"""
+		for page in self.iter_pages(max_time=max_time):
+			for post in page: yield post
+
 	def copy(self):
 		"""Returns copy (list of posts) of current stream.
 		"""
-		return [p for p in self._stream]
+		return list(self._stream)
 
-	def json(self, comments=False, **kwargs):
+	def json(self, comments=False, workers=None, **kwargs):
 		"""Returns JSON encoded string containing stream's data.
 
+		Posts whose comments could not be fetched keep the comments
+		embedded in their data and a warning is issued.
+
 		:param comments: to include comments or not to include 'em, that is the question this param holds answer to
 		:type comments: bool
+		:param workers: maximal number of simultaneous requests for comments (defaults to comment_workers)
+		:type workers: int
 		"""
 		stream = [post for post in self._stream]
 		if comments:
-			for i, post in enumerate(stream):
-				post._fetchcomments()
-				comments = [c.data for c in post.comments]
-				post['interactions']['comments'] = comments
-				stream[i] = post
+			failed = self._fetchcomments(stream, workers=workers)
+			for post, error in failed.items():
+				warnings.warn('fetching comments of post {0}: {1}'.format(post.guid, error))
+			for post in stream:
+				if post in failed: continue
+				post._data['interactions']['comments'] = [c._data for c in post.comments]
 		stream = [post._data for post in stream]
 		return json.dumps(stream, **kwargs)
 
@@ -218,9 +472,9 @@ class Outer(Generic):
 	"""Object used by diaspy.models.User to represent
 	stream of other user.
 	"""
-	def __init__(self, connection, guid, fetch=True):
+	def __init__(self, connection, guid, fetch=True, fields=None):
 		location = 'people/{}/stream.json'.format(guid)
-		super().__init__(connection, location, fetch)
+		super().__init__(connection, location, fetch, fields=fields)
 
 class Stream(Generic):
 	"""The main stream containing the combined posts of the
@@ -228,10 +482,13 @@ class Stream(Generic):
 	if the user enabled those.
 	"""
 	location = 'stream.json'
+	upload_workers = 4
 
 	def post(self, text='', aspect_ids='public', photos=None, photo='', poll_question=None, poll_answers=None, location_coords=None, provider_display_name=''):
 		"""This function sends a post to an aspect.
 		If both `photo` and `photos` are specified `photos` takes precedence.
+		Several photos are uploaded concurrently (at most `upload_workers`
+		at once) before the post is created.
 
 		:param text: Text to post.
 		:type text: str
@@ -239,11 +496,11 @@ class Stream(Generic):
 		:param aspect_ids: Aspect ids to send post to.
 		:type aspect_ids: str
 
-		:param photo: filename of photo to post
-		:type photo: str
+		:param photo: filename of photo to post (or list of filenames)
+		:type photo: str, os.PathLike or list of them
 
-		:param photos: id of photo to post (obtained from _photoupload())
-		:type photos: int
+		:param photos: id of photo to post (obtained from _photoupload()) or list of ids
+		:type photos: int or list of int
 
 		:param provider_display_name: name of provider displayed under the post
 		:type provider_display_name: str
@@ -262,8 +519,7 @@ class Stream(Generic):
 		data = {}
 		data['aspect_ids'] = aspect_ids
 		data['status_message'] = {'text': text, 'provider_display_name': provider_display_name}
-		if photo: data['photos'] = self._photoupload(photo)
-		if photos: data['photos'] = photos
+		if photo or photos: data['photos'] = self._photoids(photo, photos)
 		if poll_question and poll_answers:
 			data['poll_question'] = poll_question
 			data['poll_answers'] = poll_answers
@@ -280,8 +536,17 @@ class Stream(Generic):
 		post = Post(self._connection, id=post_json['id'], guid=post_json['guid'], post_data=post_json)
 		return post
 
+	def _photoids(self, photo, photos):
+		"""Returns `photos` or, if they are not given, id(s) of uploaded
+		`photo` (one filename or a list or tuple of them).
+		"""
+		if photos: return photos
+		if isinstance(photo, (list, tuple)): return self._photouploads(photo)
+		return self._photoupload(photo)
+
 	def _photoupload(self, filepath, aspects=[]):
 		"""Uploads picture to the pod.
+		Picture is streamed from the file, not read into memory.
 
 		:param filepath: path to picture file
 		:type filepath: str
@@ -290,16 +555,12 @@ class Stream(Generic):
 
 		:returns: id of the photo being uploaded
 		"""
-		data = open(filepath, 'rb')
-		image = data.read()
-		data.close()
-
 		params = {}
 		params['photo[pending]'] = 'true'
 		params['set_profile_image'] = ''
 		filename=os.path.basename(filepath)
 		params['qqfile'] = filename
-		if not aspects: aspects = self._connection.getUserData()['aspects']
+		if not aspects: aspects = self._connection.getUserData(cached=True)['aspects']
 		for i, aspect in enumerate(aspects):
 			params['photo[aspect_ids][{0}]'.format(i)] = aspect['id']
 
@@ -307,11 +568,28 @@ class Stream(Generic):
 				   'x-csrf-token': repr(self._connection),
 				   'x-file-name': filename}
 
-		request = self._connection.post('photos', data=image, params=params, headers=headers)
+		with open(filepath, 'rb') as data:
+			request = self._connection.post('photos', data=data, params=params, headers=headers)
 		if request.status_code != 200:
 			raise errors.StreamError('photo cannot be uploaded: {0}'.format(request.status_code))
 		return request.json()['data']['photo']['id']
 
+	def _photouploads(self, filepaths, aspects=[], workers=None):
+		"""Uploads pictures to the pod concurrently.
+
+		:param filepaths: paths to picture files
+		:type filepaths: list of str
+		:param workers: maximal number of simultaneous uploads (defaults to upload_workers)
+		:type workers: int
+
+		:returns: list of ids of uploaded photos (in order of files)
+		"""
+		if workers is None: workers = self.upload_workers
+		# aspects are resolved once, not by every upload
+		if not aspects: aspects = self._connection.getUserData(cached=True)['aspects']
+		with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+			return list(executor.map(lambda filepath: self._photoupload(filepath, aspects), filepaths))
+
 
 class Activity(Stream):
 	"""Stream representing user's activity.
@@ -487,13 +765,15 @@ class FollowedTags(Generic):
 class Tag(Generic):
 	"""This stream contains all posts containing a tag.
 	"""
-	def __init__(self, connection, tag, fetch=True):
+	def __init__(self, connection, tag, fetch=True, fields=None):
 		"""
 		:param connection: Connection() object
 		:type connection: diaspy.connection.Connection
 		:param tag: tag name
 		:type tag: str
+		:param fields: dotted paths of fields of post data to keep (optional)
+		:type fields: list of str
 		"""
 		location = 'tags/{0}.json'.format(tag)
-		super().__init__(connection, location.format(tag), fetch=fetch)
+		super().__init__(connection, location.format(tag), fetch=fetch, fields=fields)
 		self._connection = connection
@@ -20,9 +20,11 @@ setup(
         'Topic :: Software Development :: Libraries :: Python Modules',
         'Topic :: Utilities',
     ],
-    packages=find_packages(),
+    # benchmarks (and the fake pod used by tests) are importable from the source tree only
+    packages=find_packages(exclude=('benchmarks', 'benchmarks.*')),
     install_requires=['requests', 'python-dateutil'],
     extras_require={
-        'beautifulsoup4': ["beautifulsoup4>=3.2.1"]
+        'beautifulsoup4': ["beautifulsoup4>=3.2.1"],
+        'aiohttp': ["aiohttp"]
     }
 )
@@ -2,7 +2,15 @@
 
 from __future__ import print_function
 
+import io
+import itertools
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
 import unittest
+import unittest.mock
 
 #	failure to import any of the modules below indicates failed tests
 #	=================================================================
@@ -12,6 +20,7 @@ import requests
 import warnings
 #	actual diaspy code
 import diaspy
+import benchmarks.fakepod
 
 
 ####	SETUP STUFF
@@ -61,6 +70,76 @@ class ConnectionTest(unittest.TestCase):
 		info = test_connection.getUserData()
 		self.assertEqual(dict, type(info))
 
+	def testTokenIsCached(self):
+		token = test_connection.get_token(fetch=False)
+		self.assertEqual(token, repr(test_connection))
+
+	def testLimiterIsSharedByPod(self):
+		self.assertIs(diaspy.ratelimit.forpod(test_connection.pod), test_connection.getLimiter())
+
+	def testCollectingMetrics(self):
+		collector = diaspy.metrics.Collector().attach(test_connection)
+		test_connection.get('stream')
+		collector.detach(test_connection)
+		self.assertEqual(1, collector.metrics()[('GET', 'stream', '')]['count'])
+
+	def testReplayingCassette(self):
+		path = os.path.join(tempfile.gettempdir(), 'diaspy-test.cassette')
+		with diaspy.cassette.Cassette(path, 'record') as cassette:
+			connection = diaspy.connection.Connection(pod=__pod__, username=__username__, password=__passwd__, cassette=cassette)
+			recorded = connection.get('stream').text
+		connection = diaspy.connection.Connection(pod=__pod__, username=__username__, password=__passwd__,
+												  cassette=diaspy.cassette.Cassette(path))
+		self.assertEqual(recorded, connection.get('stream').text)
+		self.assertRaises(diaspy.errors.CassetteError, connection.get, 'not/recorded')
+
+
+class RateLimiterTests(unittest.TestCase):
+	def response(self, status_code, retry_after=None):
+		response = requests.Response()
+		response.status_code = status_code
+		if retry_after is not None: response.headers['Retry-After'] = retry_after
+		return response
+
+	def testBucket(self):
+		limiter = diaspy.ratelimit.RateLimiter(rate=10, burst=2)
+		self.assertEqual(0, limiter.reserve())
+		self.assertEqual(0, limiter.reserve())
+		self.assertAlmostEqual(0.1, limiter.reserve(), places=2)
+		self.assertAlmostEqual(0.2, limiter.reserve(), places=2)
+
+	def testParsingRetryAfter(self):
+		self.assertEqual(120, diaspy.ratelimit.retryafter('120'))
+		self.assertEqual(0, diaspy.ratelimit.retryafter('Wed, 01 Jan 2020 00:00:00 GMT'))
+		self.assertIsNone(diaspy.ratelimit.retryafter('soon'))
+		self.assertIsNone(diaspy.ratelimit.retryafter(None))
+
+	def testDelayingRetries(self):
+		limiter = diaspy.ratelimit.RateLimiter(max_retries=2, max_delay=10)
+		self.assertEqual(5, limiter.delay(self.response(429, '5'), 0))
+		self.assertEqual(2, limiter.delay(self.response(503), 1))
+		self.assertIsNone(limiter.delay(self.response(429, '5'), 2))
+		self.assertIsNone(limiter.delay(self.response(429, '60'), 0))
+		self.assertIsNone(limiter.delay(self.response(404), 0))
+
+	def testHoldingBackWhenNotRetrying(self):
+		limiter = diaspy.ratelimit.RateLimiter(max_delay=10)
+		response = self.response(429, '60')
+		self.assertIsNone(limiter.delay(response, 0))
+		limiter.hold(response)
+		self.assertAlmostEqual(60, limiter.reserve(), places=0)
+
+
+class ImportTest(unittest.TestCase):
+	def testImportingIsLazy(self):
+		code = ('import sys, diaspy; '
+				'print(*[name for name in ("aiohttp", "asyncio", "bs4", "dateutil", "requests") if name in sys.modules])')
+		self.assertEqual('', subprocess.check_output([sys.executable, '-c', code], universal_newlines=True).strip())
+
+	def testImportingSubmoduleOnAccess(self):
+		self.assertIs(diaspy.conversations, diaspy.messages)
+		self.assertEqual('diaspy.streams', diaspy.streams.__name__)
+
 
 class MessagesTests(unittest.TestCase):
 	def testGettingMailbox(self):
@@ -104,6 +183,19 @@ class StreamTest(unittest.TestCase):
 		stream = diaspy.streams.Generic(test_connection)
 		len(stream)
 
+	def testLookingUpPostsByGUID(self):
+		stream = diaspy.streams.Generic(test_connection)
+		for post in stream:
+			self.assertIn(post, stream)
+			self.assertIn(post.guid, stream)
+			self.assertIs(post, stream[post.guid])
+
+	def testIteratingPosts(self):
+		stream = diaspy.streams.Activity(test_connection, fetch=False)
+		guids = [post.guid for post in stream.iter_posts()]
+		self.assertEqual(len(guids), len(set(guids)))
+		self.assertEqual(0, len(stream))
+
 	def testClearing(self):
 		stream = diaspy.streams.Stream(test_connection)
 		stream.clear()
@@ -205,6 +297,49 @@ class ContactsTest(unittest.TestCase):
 		for i in result:
 			self.assertEqual(diaspy.people.User, type(i))
 
+	def testIterContacts(self):
+		contacts = diaspy.people.Contacts(test_connection)
+		result = [user.guid() for user in contacts.iter_contacts(set='all')]
+		self.assertEqual([user.guid() for user in contacts.get(set='all')], result)
+
+
+class CacheTests(unittest.TestCase):
+	post = {'guid': 'b0000001', 'id': 2, 'text': 'Post number 2.', 'interactions': {'comments_count': 1}}
+
+	def testStoringPosts(self):
+		cache = diaspy.cache.PostCache()
+		cache.put(self.post, etag='"post-1"', last_modified='Wed, 01 Jan 2020 00:00:00 GMT')
+		entry = cache.get(self.post['guid'])
+		self.assertEqual(self.post, entry['data'])
+		self.assertEqual('"post-1"', entry['etag'])
+		self.assertIsNone(cache.get('b0000002'))
+
+	def testKeepingValidatorsOfUnchangedData(self):
+		cache = diaspy.cache.PostCache()
+		cache.put(self.post, etag='"post-1"', last_modified='Wed, 01 Jan 2020 00:00:00 GMT')
+		cache.putmany([dict(self.post)])
+		entry = cache.get(self.post['guid'])
+		self.assertEqual('"post-1"', entry['etag'])
+		self.assertEqual('Wed, 01 Jan 2020 00:00:00 GMT', entry['last_modified'])
+
+	def testDroppingValidatorsOfChangedData(self):
+		cache = diaspy.cache.PostCache()
+		cache.put(self.post, etag='"post-1"', last_modified='Wed, 01 Jan 2020 00:00:00 GMT')
+		cache.putmany([dict(self.post, text='Edited.')])
+		entry = cache.get(self.post['guid'])
+		self.assertEqual('Edited.', entry['data']['text'])
+		self.assertIsNone(entry['etag'])
+		self.assertIsNone(entry['last_modified'])
+		cache.put(self.post, etag='"post-2"')
+		self.assertEqual('"post-2"', cache.get(self.post['guid'])['etag'])
+
+	def testStoringComments(self):
+		cache = diaspy.cache.PostCache()
+		cache.put(self.post)
+		cache.putcomments(self.post['guid'], [{'id': 1, 'text': 'Comment.'}], 1)
+		self.assertEqual([{'id': 1, 'text': 'Comment.'}], cache.comments(self.post['guid'], 1))
+		self.assertIsNone(cache.comments(self.post['guid'], 2))
+
 
 class PostTests(unittest.TestCase):
 	def testStringConversion(self):
@@ -214,7 +349,29 @@ class PostTests(unittest.TestCase):
 		s = diaspy.streams.Stream(test_connection)
 
 
+@unittest.skipUnless(diaspy.models.BS4_SUPPORT, 'bs4 is not installed')
+class NotificationParsingTests(unittest.TestCase):
+	def notification(self, id, note_html):
+		return diaspy.models.Notification(None, {'type': 'liked', 'liked': {'id': id, 'unread': True, 'note_html': note_html}})
+
+	def testParsingUnbalancedNote(self):
+		unclosed = self.notification(1, '<div class="media-body"><a href="/people/aaa" class="hovercardable">A</a> '
+										'liked <a href="/posts/1" data-ref="1">your post')
+		following = self.notification(2, '<div class="media-body"><a href="/people/bbb" class="hovercardable">B</a> '
+										 'liked your post <a href="/posts/2" data-ref="2">Post.</a></div>')
+		diaspy.models.Notification.parseall([unclosed, following])
+		self.assertEqual(('A liked your post', ['aaa'], '1'), (str(unclosed), unclosed.who(), unclosed.about()))
+		self.assertEqual(('B liked your post Post.', ['bbb'], '2'), (str(following), following.who(), following.about()))
+
+
 class NotificationsTests(unittest.TestCase):
+	def testUpdating(self):
+		notifications = diaspy.notifications.Notifications(test_connection)
+		before = len(notifications)
+		new = notifications.update()
+		self.assertEqual(before + new, len(notifications))
+		self.assertEqual(len(notifications), len(set(n.id for n in notifications)))
+
 	def testMarkingRead(self):
 		notifications = diaspy.notifications.Notifications(test_connection)
 		notif = None
@@ -261,6 +418,299 @@ class SettingsTests(unittest.TestCase):
 		self.assertEqual(testconf.user_email, self.account.getEmail())
 
 
+class FakePodTestCase(unittest.TestCase):
+	"""Base of tests run offline against benchmarks.fakepod.FakePod
+	(they do not need testconf nor real pod).
+	"""
+	def connect(self, **options):
+		"""Creates fake pod (available as self.pod) and returns connection
+		passing requests straight to it.
+		"""
+		self.pod = benchmarks.fakepod.FakePod(**options)
+		return diaspy.connection.Connection(self.pod.url, 'user', 'password', adapter=self.pod.adapter())
+
+	def start(self, **options):
+		"""Creates fake pod (available as self.pod) serving requests over
+		HTTP, use it as context manager.
+		"""
+		self.pod = benchmarks.fakepod.FakePod(**options)
+		return self.pod.start()
+
+
+class OfflineConnectionTests(FakePodTestCase):
+	def testRetryingWriteWithStaleToken(self):
+		connection = self.connect()
+		connection.get_token()
+		self.pod.rotate_token()
+		fetches = self.pod.requests[('GET', 'stream')]
+		self.assertEqual(201, connection.post('posts/1/comments', data={'text': 'Comment.'}).status_code)
+		self.assertEqual(fetches + 1, self.pod.requests[('GET', 'stream')])
+
+	def testRetryingWriteRedirectedToSignIn(self):
+		connection = self.connect(redirect_rejected=True)
+		connection.get_token()
+		self.pod.rotate_token()
+		request = connection.post('posts/1/comments', data={'text': 'Comment.'})
+		self.assertEqual(201, request.status_code)
+		self.assertEqual(1, self.pod.requests[('GET', 'users/sign_in')])
+
+	def testNotRetryingFailedValidation(self):
+		connection = self.connect()
+		post = diaspy.models.Post(connection, id=1, guid='b0000000', fetch=False, comments=False, post_data={'id': 1, 'interactions': {}})
+		post.like()
+		fetches = self.pod.requests[('GET', 'stream')]
+		self.assertRaises(diaspy.errors.PostError, post.like)
+		self.assertEqual(fetches, self.pod.requests[('GET', 'stream')])
+		self.assertEqual(2, self.pod.requests[('POST', 'posts/{id}/likes')])
+
+
+class OfflineMessagesTests(FakePodTestCase):
+	def testIteratingConversations(self):
+		mailbox = diaspy.messages.Mailbox(self.connect(conversations=20))
+		self.assertEqual(list(range(1, 21)), [c.id for c in mailbox.iter_conversations()])
+
+	def testHydrating(self):
+		mailbox = diaspy.messages.Mailbox(self.connect(conversations=10))
+		self.assertEqual({}, mailbox.hydrate())
+		self.assertEqual(10, self.pod.requests[('GET', 'conversations/{id}.json')])
+
+	@unittest.skipUnless(diaspy.connection.AIOHTTP_SUPPORT, 'aiohttp is not installed')
+	def testFetchingAsynchronously(self):
+		import asyncio
+
+		async def fetch():
+			async with diaspy.connection.AsyncConnection(self.pod.url, 'user', 'password') as connection:
+				mailbox = diaspy.messages.Mailbox(connection, fetch=False)
+				await mailbox.afetch()
+				return [c.get_subject() for c in mailbox]
+
+		with self.start(conversations=10):
+			subjects = asyncio.run(fetch())
+		self.assertEqual(10, len(subjects))
+		self.assertEqual(10, self.pod.requests[('GET', 'conversations/{id}.json')])
+
+
+class OfflineStreamTests(FakePodTestCase):
+	def testPostingImageFromPath(self):
+		connection = self.connect(posts=15, comments=0)
+		stream = diaspy.streams.Stream(connection, fetch=False)
+		with tempfile.TemporaryDirectory() as path:
+			image = pathlib.Path(path, 'image.png')
+			image.write_bytes(b'image')
+			stream.post(text=post_text, photo=image)
+		self.assertEqual(1, self.pod.requests[('POST', 'photos')])
+		self.assertEqual(1, self.pod.requests[('POST', 'status_messages')])
+
+	def testProjecting(self):
+		data = {'id': 1, 'author': {'guid': 'a1', 'name': 'Foo'}, 'text': 'Post.'}
+		self.assertEqual({'author': {'guid': 'a1'}, 'text': 'Post.'},
+						 diaspy.streams.project(data, ['author.guid', 'text', 'poll.question', 'text.length']))
+
+	def testKeepingOnlyRequestedFields(self):
+		connection = self.connect(posts=30, comments=5)
+		stream = diaspy.streams.Stream(connection, fields=['text', 'author.guid'])
+		stream.more()
+		self.pod.publish(2)
+		stream.update()
+		# pages overlap on the post created at max_time
+		self.assertEqual(31, len(stream))
+		self.assertEqual(31, len(set(post.guid for post in stream)))
+		self.assertEqual('{0:016x}'.format(0xb0000000 - 2), stream[0].guid)
+		for post in stream:
+			self.assertEqual({'id', 'guid', 'created_at', 'interactions', 'text', 'author'}, set(post.data()))
+			self.assertEqual({'guid'}, set(post['author']))
+			self.assertEqual({'comments_count'}, set(post['interactions']))
+		self.assertEqual(0, self.pod.requests[('GET', 'posts/{id}/comments.json')])
+
+	def testWatching(self):
+		connection = self.connect(posts=30, comments=0)
+		stream = diaspy.streams.Stream(connection)
+		polls = []
+
+		def publish(event):
+			if event['endpoint'] != 'stream.json': return
+			polls.append(event['status'])
+			if len(polls) == 2: self.pod.publish(2)
+			if len(polls) == 4: self.pod.publish(1)
+
+		connection.addHook('after', publish)
+		sleeps = []
+		with unittest.mock.patch('diaspy.streams.time.sleep', sleeps.append):
+			watch = stream.watch(interval=30, min_interval=5, max_interval=100)
+			posts = [next(watch) for i in range(3)]
+		self.assertEqual([304, 304, 200, 304, 200], polls)
+		# doubled after polls without new posts (up to max_interval), halved after the ones with them
+		self.assertEqual([60, 100, 50, 100], sleeps)
+		self.assertEqual(['Post number -1.', 'Post number -2.', 'Post number -3.'], [post['title'] for post in posts])
+		self.assertEqual(18, len(stream))
+
+
+class OfflineCacheTests(FakePodTestCase):
+	def testRevalidatingPostAfterStreamRefresh(self):
+		connection = self.connect(posts=15, comments=0)
+		connection.set_post_cache(diaspy.cache.PostCache())
+		collector = diaspy.metrics.Collector().attach(connection)
+		guid = diaspy.streams.Stream(connection)[0].guid
+		diaspy.models.Post(connection, guid=guid).fetch()
+		diaspy.streams.Stream(connection)
+		post = diaspy.models.Post(connection, guid=guid)
+		post.fetch()
+		self.assertEqual(guid, post['guid'])
+		self.assertEqual({200: 1, 304: 1}, collector.metrics()[('GET', 'posts/{guid}.json', '')]['statuses'])
+
+
+class OfflinePostTests(FakePodTestCase):
+	guid = '{0:016x}'.format(0xb0000000 + 4)
+
+	def testFetchingOnFirstAccess(self):
+		connection = self.connect(comments=5)
+		sent = sum(self.pod.requests.values())
+		post = diaspy.models.Post(connection, guid=self.guid)
+		self.assertEqual(sent, sum(self.pod.requests.values()))
+		self.assertEqual('Post number 4.', post['title'])
+		self.assertEqual(1, self.pod.requests[('GET', 'posts/{guid}.json')])
+		self.assertEqual(0, self.pod.requests[('GET', 'posts/{id}/comments.json')])
+		self.assertEqual(4, len(post.comments))
+		self.assertEqual(1, self.pod.requests[('GET', 'posts/{id}/comments.json')])
+		post['text']
+		len(post.comments)
+		self.assertEqual(sent + 2, sum(self.pod.requests.values()))
+
+	@unittest.skipUnless(diaspy.connection.AIOHTTP_SUPPORT, 'aiohttp is not installed')
+	def testFetchingAsynchronously(self):
+		import asyncio
+
+		async def fetch():
+			async with diaspy.connection.AsyncConnection(self.pod.url, 'user', 'password') as connection:
+				lazy = diaspy.models.Post(connection, guid=self.guid)
+				self.assertRaises(diaspy.errors.PostError, lazy.__getitem__, 'text')
+				post = await diaspy.models.Post(connection, guid=self.guid).afetch()
+				return post['title'], len(post.comments)
+
+		with self.start(comments=5):
+			self.assertEqual(('Post number 4.', 4), asyncio.run(fetch()))
+		self.assertEqual(1, self.pod.requests[('GET', 'posts/{id}/comments.json')])
+
+
+class OfflineNotificationsTests(FakePodTestCase):
+	def testFillingGapWhileNotificationsArrive(self):
+		connection = self.connect(notifications=10)
+		notifications = diaspy.notifications.Notifications(connection)
+		self.pod.notifications = 30
+
+		def arrive(event):
+			# pages shift by two notifications after every fetched page
+			if event['endpoint'] == 'notifications.json': self.pod.notifications += 2
+
+		connection.addHook('after', arrive)
+		self.assertEqual(20, notifications.update(per_page=5))
+		ids = [n.id for n in notifications]
+		self.assertEqual(len(ids), len(set(ids)))
+		self.assertEqual(list(range(30, 5, -1)), ids)
+
+	def testUpdatingFromPage(self):
+		connection = self.connect(notifications=10)
+		notifications = diaspy.notifications.Notifications(connection)
+		self.pod.notifications = 20
+		self.assertEqual(5, notifications.update(5, 2))
+		self.assertEqual(list(range(15, 5, -1)), [n.id for n in notifications])
+		self.assertEqual(3, self.pod.requests[('GET', 'notifications.json')])
+
+
+class OfflineSettingsTests(FakePodTestCase):
+	def download(self, connection, path):
+		"""Downloads photos and returns their number and statuses of responses for them.
+		"""
+		statuses = []
+
+		def collect(event):
+			if event['endpoint'].startswith('uploads/'): statuses.append(event['status'])
+
+		connection.addHook('after', collect)
+		try:
+			return (diaspy.settings.Account(connection).downloadPhotos(path=path, _critical=True), sorted(statuses))
+		finally:
+			connection.removeHook('after', collect)
+
+	def testDownloadingExportToFile(self):
+		account = diaspy.settings.Account(self.connect(posts=20, comments=5, contacts=5))
+		account.chunk_size = 1024
+		whole = unittest.mock.PropertyMock(side_effect=AssertionError('export was read into memory'))
+		with tempfile.TemporaryDirectory() as path:
+			filename = os.path.join(path, 'export.xml')
+			with unittest.mock.patch.object(requests.Response, 'content', whole):
+				self.assertEqual(filename, account.downloadxml(filename))
+			with open(filename, encoding='utf-8') as ifstream: self.assertEqual(account.downloadxml(), ifstream.read())
+			items = list(diaspy.settings.iterxml(filename))
+		self.assertEqual([('aspects', 2), ('contacts', 5), ('posts', 20), ('comments', 46)],
+						 [(section, len(list(group))) for section, group in itertools.groupby(items, lambda item: item[0])])
+		self.assertEqual(('posts', 'status_message'), items[7][:2])
+		self.assertEqual('{0:016x}'.format(0xb0000000), items[7][2]['guid'])
+
+	def testIteratingExportSections(self):
+		export = io.BytesIO(b'<XML><user><name>Foo</name></user>'
+							b'<aspects><aspect><name>Friends</name></aspect></aspects>'
+							b'<contacts><contact><person_guid>a1</person_guid>'
+							b'<aspects><aspect><name>Friends</name></aspect><aspect><name>Work</name></aspect></aspects>'
+							b'</contact></contacts>'
+							b'<posts><status_message><guid>b1</guid><text>Post.</text></status_message></posts></XML>')
+		self.assertEqual([('contacts', 'contact', {'person_guid': 'a1', 'aspects': {'aspect': [{'name': 'Friends'}, {'name': 'Work'}]}}),
+						  ('posts', 'status_message', {'guid': 'b1', 'text': 'Post.'})],
+						 list(diaspy.settings.iterxml(export, sections=('contacts', 'posts'))))
+
+	def testDownloadingPhotos(self):
+		connection = self.connect(posts=30, photos=2, photo_size=1000)
+		with tempfile.TemporaryDirectory() as path:
+			self.assertEqual((30, [200] * 30), self.download(connection, path))
+			self.assertEqual(30, len(os.listdir(path)))
+			self.assertEqual({1000}, {os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)})
+
+	def testSkippingPresentPhotos(self):
+		connection = self.connect(posts=30, photos=2, photo_size=1000)
+		with tempfile.TemporaryDirectory() as path:
+			self.download(connection, path)
+			self.assertEqual((0, []), self.download(connection, path))
+
+	def testResumingDownload(self):
+		connection = self.connect(posts=30, photos=2, photo_size=1000)
+		with tempfile.TemporaryDirectory() as path:
+			self.download(connection, path)
+			filename = os.path.join(path, sorted(os.listdir(path))[0])
+			with open(filename, 'rb') as ifstream: photo = ifstream.read()
+			with open(filename + '.part', 'wb') as ofstream: ofstream.write(photo[:400])
+			os.remove(filename)
+			self.assertEqual((1, [206]), self.download(connection, path))
+			with open(filename, 'rb') as ifstream: self.assertEqual(photo, ifstream.read())
+			self.assertFalse(os.path.exists(filename + '.part'))
+
+	def testFinishingCompletePartialDownload(self):
+		connection = self.connect(posts=30, photos=2, photo_size=1000)
+		with tempfile.TemporaryDirectory() as path:
+			self.download(connection, path)
+			filename = os.path.join(path, sorted(os.listdir(path))[0])
+			os.replace(filename, filename + '.part')
+			self.assertEqual((1, [416]), self.download(connection, path))
+			self.assertEqual(1000, os.path.getsize(filename))
+
+	def testDownloadingChangedPhotoAgain(self):
+		connection = self.connect(posts=30, photos=2, photo_size=1000)
+		with tempfile.TemporaryDirectory() as path:
+			self.download(connection, path)
+			filename = os.path.join(path, sorted(os.listdir(path))[0])
+			os.replace(filename, filename + '.part')
+			self.pod.photo_size = 500
+			self.assertEqual((1, [200, 416]), self.download(connection, path))
+			self.assertEqual(500, os.path.getsize(filename))
+			self.assertFalse(os.path.exists(filename + '.part'))
+
+	def testDownloadingPhotosWithoutComments(self):
+		connection = self.connect(posts=30, comments=5)
+		with tempfile.TemporaryDirectory() as path:
+			self.assertEqual(0, diaspy.settings.Account(connection).downloadPhotos(path=path))
+		self.assertTrue(self.pod.requests[('GET', 'activity.json')])
+		self.assertEqual(0, self.pod.requests[('GET', 'posts/{id}/comments.json')])
+
+
 if __name__ == '__main__':
 	print('Hello World!')
 	print('It\'s testing time!')